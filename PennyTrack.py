@@ -1,9 +1,33 @@
+import argparse
+import copy
 import csv
+import io
 import os
 import json
+import lzma
+import struct
+import time
+import zlib
+import functools
+import itertools
+import cProfile
 from datetime import datetime, timedelta
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
+from collections.abc import Sequence
+from bisect import bisect_left, bisect_right
 import shutil
+import sys
+import threading
+import multiprocessing
+from multiprocessing import shared_memory
+from array import array
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 
 class Colors:
@@ -24,18 +48,1939 @@ class Colors:
         Colors.WHITE = Colors.BOLD = Colors.RESET = ''
 
 
+class Profiler:
+    """Per-operation timings and I/O counters for ExpenseTracker.
+
+    Counters are inclusive: a reload triggered inside add_expense is
+    charged to both the add and the load. While disabled, instrumented
+    methods call straight through, so the cost is one attribute check.
+    """
+    COUNTERS = ('rows_scanned', 'bytes_read', 'bytes_written', 'cache_hits', 'reloads')
+    OPERATIONS = []
+    
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.stats = {}
+        self.armed = None
+        self.last_profile = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+    
+    def reset(self):
+        with self._lock:
+            self.stats = {}
+    
+    def arm(self, operation):
+        """Capture the next call of operation with cProfile"""
+        self.armed = operation
+    
+    def ignore_current_thread(self):
+        """Leave calls made on this thread (background work) out of the stats"""
+        self._local.ignored = True
+    
+    def count(self, counter, amount=1):
+        if not self.enabled:
+            return
+        for frame in getattr(self._local, 'stack', ()):
+            frame[counter] += amount
+    
+    def call(self, operation, func, *args, **kwargs):
+        if getattr(self._local, 'ignored', False):
+            return func(*args, **kwargs)
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        frame = dict.fromkeys(self.COUNTERS, 0)
+        stack.append(frame)
+        start = time.perf_counter()
+        try:
+            if self.armed == operation:
+                self.armed = None
+                profile = cProfile.Profile()
+                try:
+                    return profile.runcall(func, *args, **kwargs)
+                finally:
+                    self.last_profile = f"profile_{operation}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pstats"
+                    profile.dump_stats(self.last_profile)
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            stack.pop()
+            with self._lock:
+                entry = self.stats.get(operation)
+                if entry is None:
+                    entry = self.stats[operation] = dict(calls=0, seconds=0.0, max_seconds=0.0,
+                                                         **dict.fromkeys(self.COUNTERS, 0))
+                entry['calls'] += 1
+                entry['seconds'] += elapsed
+                entry['max_seconds'] = max(entry['max_seconds'], elapsed)
+                for counter in self.COUNTERS:
+                    entry[counter] += frame[counter]
+    
+    def export_json(self, filename):
+        with self._lock:
+            data = {name: dict(entry) for name, entry in self.stats.items()}
+        with open(filename, 'w') as f:
+            json.dump(data, f, indent=2)
+        return filename
+
+
+def instrumented(operation):
+    """Record calls of an ExpenseTracker method under operation"""
+    Profiler.OPERATIONS.append(operation)
+    
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if not self.profiler.enabled:
+                return func(self, *args, **kwargs)
+            return self.profiler.call(operation, func, self, *args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def approx_bytes(value, sample=64):
+    """Rough resident size of a derived value and the containers inside it.
+
+    Objects with an approx_size() method report their own size and NumPy
+    arrays their buffer. Long lists are extrapolated from a sample; strings
+    inside containers are taken to be shared with the ledger rows.
+    """
+    if hasattr(value, 'approx_size'):
+        return value.approx_size()
+    if np is not None and isinstance(value, np.ndarray):
+        return value.nbytes
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        return size + sum(approx_bytes(v) for v in value.values() if not isinstance(v, str))
+    if isinstance(value, (list, tuple)) and value:
+        sampled = value[::max(1, len(value) // sample)]
+        per_item = sum(approx_bytes(v) for v in sampled if not isinstance(v, str)) / len(sampled)
+        return size + int(per_item * len(value))
+    return size
+
+
+class LedgerSnapshot:
+    """Immutable, versioned view of the ledger.
+
+    Writers never touch a published snapshot: they build a new row tuple
+    and swap it in, so a reader that pinned a snapshot keeps a consistent
+    view for as long as it holds it, without copying the rows.
+    
+    generations counts writes per month (YYYY-MM); writes whose months
+    are unknown, such as reloads and rewrites, count under '*'.
+    """
+    __slots__ = ('version', 'rows', 'generations', '_derived')
+
+    def __init__(self, version, rows, generations=None):
+        self.version = version
+        self.rows = tuple(rows)
+        self.generations = generations or {}
+        self._derived = {}
+
+    def __len__(self):
+        return len(self.rows)
+    
+    def approx_size(self, sample=256):
+        """Estimated resident bytes of the rows (extrapolated from a sample)
+        and of everything derived from them, such as indexes and columns"""
+        derived = sum(approx_bytes(value) for value in list(self._derived.values()))
+        if not self.rows:
+            return sys.getsizeof(self.rows) + derived
+        step = max(1, len(self.rows) // sample)
+        sampled = self.rows[::step]
+        per_row = sum(sys.getsizeof(row) + sum(sys.getsizeof(v) for v in row.values())
+                      for row in sampled) / len(sampled)
+        return int(per_row * len(self.rows)) + sys.getsizeof(self.rows) + derived
+
+    def __iter__(self):
+        return iter(self.rows)
+    
+    def generation(self, months=None):
+        """Write stamp for results read from months, or from the whole ledger when None"""
+        if months is None:
+            return self.version
+        generations = self.generations
+        return (generations.get('*', 0),) + tuple(generations.get(m, 0) for m in months)
+    
+    def derive(self, key, build):
+        """Memoize a value computed from this version's rows"""
+        try:
+            return self._derived[key]
+        except KeyError:
+            value = self._derived[key] = build()
+            return value
+    
+    def date_order(self):
+        """Row positions sorted by date (stable), built once per version"""
+        rows = self.rows
+        return self.derive('date_order', lambda: sorted(range(len(rows)), key=lambda i: rows[i]['Date']))
+    
+    def date_keys(self):
+        """Dates in date_order(), for bisecting date ranges"""
+        rows = self.rows
+        return self.derive('date_keys', lambda: [rows[i]['Date'] for i in self.date_order()])
+    
+    def by_date(self, start=None, end=None):
+        """Rows between start and end (inclusive) in date order, without sorting"""
+        order = self.date_order()
+        lo = bisect_left(self.date_keys(), start) if start else 0
+        hi = bisect_right(self.date_keys(), end) if end else len(order)
+        return RowView(self.rows, order[lo:hi])
+    
+    def extended(self, version, added, generations):
+        """The next version, with added rows appended at the end.
+
+        Derived values are carried forward instead of rebuilt: the date
+        index by merging the new rows into it, and values with an
+        extended() method (analytics column stores) through that. Batches
+        large enough that a rebuild is cheaper start with nothing derived.
+        """
+        successor = LedgerSnapshot(version, self.rows + tuple(added), generations)
+        start = len(self.rows)
+        derived = self._derived
+        if 'date_order' not in derived or len(successor.rows) - start > max(64, start // 64):
+            return successor
+        rows = successor.rows
+        new = sorted(range(start, len(rows)), key=lambda i: rows[i]['Date'])
+        dates = [rows[i]['Date'] for i in new]
+        keys = self.date_keys()
+        # After any equal dates, as the stable sort would put later rows
+        at = [bisect_right(keys, date) for date in dates]
+        successor._derived['date_order'] = insert_at(derived['date_order'], at, new)
+        successor._derived['date_keys'] = insert_at(keys, at, dates)
+        for key, value in list(derived.items()):
+            if hasattr(value, 'extended'):
+                successor._derived[key] = value.extended(successor, start)
+        return successor
+
+
+def insert_at(values, at, new):
+    """values as a list with new[k] inserted before values[at[k]]; at is ascending"""
+    result = []
+    previous = 0
+    for index, value in zip(at, new):
+        result.extend(values[previous:index])
+        result.append(value)
+        previous = index
+    result.extend(values[previous:])
+    return result
+
+
+class RowView(Sequence):
+    """Read-only sequence of rows taken in the order of an index"""
+    
+    def __init__(self, rows, order):
+        self._rows = rows
+        self._order = order
+    
+    def __len__(self):
+        return len(self._order)
+    
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._rows[j] for j in self._order[i]]
+        return self._rows[self._order[i]]
+
+
+class Pager:
+    """Page through rows without formatting or materializing the rest.
+
+    rows may be a sequence (sliced directly) or any iterator, which is
+    pulled lazily and buffered only as far as the furthest page shown.
+    Each page is formatted up front and written in a single call.
+    """
+    
+    def __init__(self, rows, format_row, header, page_size=25, total=None):
+        self.format_row = format_row
+        self.header = header
+        self.page_size = max(1, page_size)
+        if isinstance(rows, Sequence):
+            self._rows = rows
+            self._source = None
+            self.total = len(rows)
+        else:
+            self._rows = []
+            self._source = iter(rows)
+            self.total = total
+    
+    def _fill(self, count):
+        while self._source is not None and len(self._rows) < count:
+            chunk = list(itertools.islice(self._source, count - len(self._rows)))
+            self._rows.extend(chunk)
+            if len(self._rows) < count:
+                self._source = None
+                self.total = len(self._rows)
+    
+    def page_count(self):
+        """Number of pages, or None while the iterator has not been drained"""
+        if self.total is None:
+            return None
+        return max(1, -(-self.total // self.page_size))
+    
+    def page(self, number):
+        start = number * self.page_size
+        self._fill(start + self.page_size + 1)
+        return self._rows[start:start + self.page_size]
+    
+    def render(self, number):
+        lines = list(self.header)
+        lines.extend(self.format_row(row) for row in self.page(number))
+        pages = self.page_count()
+        lines.append(f"-- Page {number + 1} of {pages if pages else '?'} --")
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
+    
+    def has_page(self, number):
+        return number >= 0 and (number == 0 or bool(self.page(number)))
+    
+    def run(self):
+        """Show pages until the user quits"""
+        number = 0
+        while True:
+            self.render(number)
+            pages = self.page_count()
+            if pages == 1:
+                return
+            choice = input("[n]ext, [p]rev, page number, [q]uit: ").strip().lower()
+            if choice in ('', 'n'):
+                target = number + 1
+            elif choice == 'p':
+                target = number - 1
+            elif choice.isdigit():
+                target = int(choice) - 1
+            else:
+                return
+            if self.has_page(target):
+                number = target
+            elif choice in ('', 'n'):
+                return
+
+
+class RateTable:
+    """Exchange rates into a base currency, read from a rates file.
+
+    The file gives, per currency, the value of one unit in the file's own
+    base currency from each effective date on:
+
+        {"base": "USD", "rates": {"EUR": {"2026-01-01": 1.08, "2026-02-01": 1.10}}}
+
+    Between two effective dates the rate is interpolated linearly by day;
+    before the first or after the last date the nearest rate applies. When
+    the configured base differs from the file's, rates are crossed through
+    the file's base. Lookups are memoized per (currency, date), so a ledger
+    costs one interpolation per distinct currency and day.
+    """
+    
+    def __init__(self, base, rates=None, file_base=None):
+        self.base = base
+        self.file_base = file_base or base
+        self._points = {}
+        for currency, points in (rates or {}).items():
+            ordered = sorted((datetime.strptime(date, '%Y-%m-%d').toordinal(), float(rate))
+                             for date, rate in points.items())
+            if ordered:
+                self._points[currency] = ([d for d, _ in ordered], [r for _, r in ordered])
+        self._memo = {}
+    
+    @classmethod
+    def load(cls, filename, base):
+        try:
+            with open(filename, 'r') as f:
+                data = json.load(f)
+        except:
+            return cls(base)
+        try:
+            return cls(base, data.get('rates', {}), data.get('base', base))
+        except (ValueError, TypeError, AttributeError) as e:
+            print(f"{Colors.YELLOW}Ignoring unreadable rates in {filename}: {e}{Colors.RESET}")
+            return cls(base)
+    
+    def currencies(self):
+        return sorted({self.base, self.file_base, *self._points})
+    
+    def knows(self, currency):
+        return currency == self.base or self.rate(currency, datetime.now().strftime('%Y-%m-%d')) is not None
+    
+    def _file_rate(self, currency, day):
+        if currency == self.file_base:
+            return 1.0
+        days, values = self._points[currency]
+        i = bisect_right(days, day)
+        if i == 0:
+            return values[0]
+        if i == len(days):
+            return values[-1]
+        d0, d1 = days[i - 1], days[i]
+        return values[i - 1] + (values[i] - values[i - 1]) * (day - d0) / (d1 - d0)
+    
+    def rate(self, currency, date):
+        """Value of one unit of currency in the base currency on date, or None if
+        unknown (including for dates that are not YYYY-MM-DD)"""
+        key = (currency, date)
+        try:
+            return self._memo[key]
+        except KeyError:
+            pass
+        if currency == self.base:
+            rate = 1.0
+        else:
+            try:
+                day = datetime.strptime(date, '%Y-%m-%d').toordinal()
+                rate = self._file_rate(currency, day) / self._file_rate(self.base, day)
+            except (KeyError, ValueError, TypeError):
+                rate = None
+        self._memo[key] = rate
+        return rate
+
+
+class ReportCache:
+    """Bounded LRU of report results.
+
+    Entries are keyed by report name and parameters and stamped with the
+    generation of the months they were computed from (see
+    LedgerSnapshot.generation). A lookup only hits while that stamp is
+    unchanged, so a write invalidates results for the months it touched
+    and whole-ledger results, but not summaries of other months. Cached
+    values are shared between callers and must not be modified.
+    """
+    
+    def __init__(self, max_entries=256):
+        self.max_entries = max(1, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def lookup(self, key, stamp):
+        """(True, value) for a current entry, else (False, None)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            self.misses += 1
+            return False, None
+    
+    def store(self, key, stamp, value):
+        with self._lock:
+            self._entries[key] = (stamp, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+    
+    def approx_size(self):
+        """Estimated bytes held by the cached results"""
+        with self._lock:
+            values = [value for _, value in self._entries.values()]
+        return sys.getsizeof(self._entries) + sum(approx_bytes(value) for value in values)
+    
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else None,
+            }
+
+
+class AnalyticsEngine:
+    """Column store for one ledger version, used by the reports.
+
+    Rows are laid out in date order as parallel columns: day ordinals,
+    month numbers, amounts in integer cents, category codes and an entry
+    kind. With NumPy installed the columns are arrays and group-bys run
+    vectorized; otherwise the same operations run as plain loops. Amounts
+    are kept in cents so every sum is exact and both paths agree exactly.
+    
+    With a RateTable, amounts in other currencies are converted to its
+    base currency once, per currency over whole columns, when the engine
+    is built; currencies without a known rate are listed in unconverted
+    and counted at face value. Rows whose date is not a valid YYYY-MM-DD
+    are left out of the columns and their dates listed in invalid_dates.
+    """
+    EXPENSE, INCOME, OTHER = 0, 1, 2
+    
+    def __init__(self, snapshot, use_numpy=True, rates=None):
+        self.use_numpy = use_numpy and np is not None
+        self.rates = rates
+        self.rows = snapshot.by_date()
+        self.date_keys = snapshot.date_keys()
+        self.invalid_dates = set()
+        self.unconverted = set()
+        self.categories = []
+        self._category_codes = {}
+        
+        order = snapshot.date_order()
+        (days, months, cents, codes, kinds), foreign, kept = self._parse(snapshot.rows, order)
+        if kept is not order:
+            # Keep rows and date_keys aligned with the columns
+            self.rows = RowView(snapshot.rows, kept)
+            self.date_keys = [snapshot.rows[i]['Date'] for i in kept]
+        
+        if self.use_numpy:
+            self.days = np.asarray(days, dtype=np.int64)
+            self.months = np.asarray(months, dtype=np.int64)
+            self.cents = np.asarray(cents, dtype=np.int64)
+            self.codes = np.asarray(codes, dtype=np.int64)
+            self.kinds = np.asarray(kinds, dtype=np.int8)
+        else:
+            self.days, self.months, self.cents, self.codes, self.kinds = days, months, cents, codes, kinds
+        
+        for currency, positions in foreign.items():
+            self._convert(currency, positions, rates)
+    
+    def _parse(self, rows, positions):
+        """Column values for rows[i] for each i in positions, skipping invalid dates.
+
+        Returns the five columns (lists, or arrays with NumPy), {currency:
+        [column index]} for amounts still to be converted, and the
+        positions kept (positions itself when every date is valid).
+        """
+        if self.use_numpy:
+            return self._parse_arrays(rows, positions)
+        category_codes = self._category_codes
+        parsed_dates = {}
+        days, months, cents, codes, kinds = [], [], [], [], []
+        kind_codes = {'expense': self.EXPENSE, 'income': self.INCOME}
+        base = self.rates.base if self.rates else None
+        foreign = defaultdict(list)
+        skipped = False
+        
+        for n, i in enumerate(positions):
+            if not n % 4096:
+                yield_to_foreground()
+            row = rows[i]
+            date = row['Date']
+            parsed = parsed_dates.get(date)
+            if parsed is None:
+                try:
+                    parsed = (datetime.strptime(date, '%Y-%m-%d').toordinal(),
+                              int(date[:4]) * 12 + int(date[5:7]) - 1)
+                except ValueError:
+                    parsed = False
+                parsed_dates[date] = parsed
+            if not parsed:
+                self.invalid_dates.add(date)
+                skipped = True
+                continue
+            days.append(parsed[0])
+            months.append(parsed[1])
+            cents.append(round(float(row['Amount']) * 100))
+            code = category_codes.get(row['Category'])
+            if code is None:
+                code = category_codes[row['Category']] = len(self.categories)
+                self.categories.append(row['Category'])
+            codes.append(code)
+            kinds.append(kind_codes.get(row.get('Type', 'expense'), self.OTHER))
+            currency = row.get('Currency')
+            if base and currency and currency != base:
+                foreign[currency].append(len(cents) - 1)
+        
+        if skipped:
+            positions = [i for i in positions if parsed_dates[rows[i]['Date']]]
+        return (days, months, cents, codes, kinds), foreign, positions
+    
+    def _parse_arrays(self, rows, positions):
+        """_parse() with NumPy: each distinct date, category, type and currency
+        is handled once and the amounts are parsed as one array, so the only
+        per-row Python work is reading the fields"""
+        if len(positions) == len(rows):
+            # The whole ledger: read the fields in storage order, which is far
+            # kinder to the cache than date order, and reorder the arrays
+            source = rows
+            order = np.asarray(positions, dtype=np.int64)
+        else:
+            source = [rows[i] for i in positions]
+            order = None
+        yield_to_foreground()
+        unique_dates, date_index = self._intern([row['Date'] for row in source])
+        amounts = np.fromiter(map(float, [row['Amount'] for row in source]), dtype=np.float64, count=len(source))
+        yield_to_foreground()
+        categories, category_index = self._intern([row['Category'] for row in source])
+        types, type_index = self._intern([row.get('Type', 'expense') for row in source])
+        currencies, currency_index = self._intern([row.get('Currency') for row in source])
+        if order is not None:
+            date_index, amounts, category_index, type_index, currency_index = (
+                column[order] for column in (date_index, amounts, category_index, type_index, currency_index))
+        
+        yield_to_foreground()
+        day_values = np.zeros(len(unique_dates), dtype=np.int64)
+        month_values = np.zeros(len(unique_dates), dtype=np.int64)
+        valid = np.ones(len(unique_dates), dtype=bool)
+        for k, date in enumerate(unique_dates):
+            try:
+                day_values[k] = datetime.strptime(date, '%Y-%m-%d').toordinal()
+                month_values[k] = int(date[:4]) * 12 + int(date[5:7]) - 1
+            except ValueError:
+                valid[k] = False
+                self.invalid_dates.add(date)
+        keep = valid[date_index]
+        if not keep.all():
+            positions = np.asarray(positions, dtype=np.int64)[keep].tolist()
+            date_index, amounts, category_index, type_index, currency_index = (
+                column[keep] for column in (date_index, amounts, category_index, type_index, currency_index))
+        
+        # Categories are numbered in order of first appearance, as in the loop
+        present, first = np.unique(category_index, return_index=True)
+        lookup = np.zeros(len(categories), dtype=np.int64)
+        category_codes = self._category_codes
+        for k in present[np.argsort(first, kind='stable')].tolist():
+            code = category_codes.get(categories[k])
+            if code is None:
+                code = category_codes[categories[k]] = len(self.categories)
+                self.categories.append(categories[k])
+            lookup[k] = code
+        
+        kind_codes = {'expense': self.EXPENSE, 'income': self.INCOME}
+        kinds = np.array([kind_codes.get(t, self.OTHER) for t in types], dtype=np.int8)[type_index]
+        foreign = {}
+        base = self.rates.base if self.rates else None
+        for k, currency in enumerate(currencies):
+            if base and currency and currency != base:
+                positions_in = np.flatnonzero(currency_index == k)
+                if len(positions_in):
+                    foreign[currency] = positions_in
+        columns = (day_values[date_index], month_values[date_index], np.rint(amounts * 100).astype(np.int64),
+                   lookup[category_index], kinds)
+        return columns, foreign, positions
+    
+    @staticmethod
+    def _intern(values):
+        """(distinct values in order of first appearance, array of each value's index among them)"""
+        index = {value: k for k, value in enumerate(dict.fromkeys(values))}
+        return list(index), np.fromiter(map(index.__getitem__, values), dtype=np.int64, count=len(values))
+    
+    def extended(self, snapshot, start):
+        """This engine for snapshot, a later version with rows appended from start.
+
+        Only the new rows are parsed and converted, then merged into the
+        columns at their date positions; totals match a fresh build.
+        """
+        engine = copy.copy(self)
+        engine.categories = list(self.categories)
+        engine._category_codes = dict(self._category_codes)
+        engine.invalid_dates = set(self.invalid_dates)
+        engine.unconverted = set(self.unconverted)
+        
+        rows = snapshot.rows
+        added = sorted(range(start, len(rows)), key=lambda i: rows[i]['Date'])
+        columns, foreign, kept = engine._parse(rows, added)
+        for currency, positions in foreign.items():
+            engine._convert(currency, positions, self.rates, (columns[0], columns[2]))
+        dates = [rows[i]['Date'] for i in kept]
+        at = [bisect_right(self.date_keys, date) for date in dates]
+        engine.rows = RowView(rows, insert_at(self.rows._order, at, kept))
+        engine.date_keys = insert_at(self.date_keys, at, dates)
+        for name, values in zip(('days', 'months', 'cents', 'codes', 'kinds'), columns):
+            column = getattr(self, name)
+            setattr(engine, name, np.insert(column, at, values) if self.use_numpy else insert_at(column, at, values))
+        return engine
+    
+    def _convert(self, currency, positions, rates, columns=None):
+        """Convert the cents of rows at positions (all in currency) to the base currency.
+
+        Rates are looked up once per distinct day and applied to the whole
+        batch; both paths round half to even so they agree exactly. columns
+        is a (days, cents) pair to convert instead of the engine's.
+        """
+        if self.use_numpy:
+            days, cents = columns or (self.days, self.cents)
+            positions = np.asarray(positions, dtype=np.int64)
+            unique_days, inverse = np.unique(days[positions], return_inverse=True)
+            day_rates = [rates.rate(currency, datetime.fromordinal(int(d)).strftime('%Y-%m-%d'))
+                         for d in unique_days]
+            if None in day_rates:
+                self.unconverted.add(currency)
+                day_rates = [1.0 if r is None else r for r in day_rates]
+            factors = np.array(day_rates, dtype=np.float64)[inverse]
+            cents[positions] = np.rint(cents[positions] * factors).astype(np.int64)
+            return
+        
+        day_rates = {}
+        days, cents = columns or (self.days, self.cents)
+        for i in positions:
+            day = days[i]
+            rate = day_rates.get(day)
+            if rate is None:
+                rate = day_rates[day] = rates.rate(currency, datetime.fromordinal(day).strftime('%Y-%m-%d'))
+                if rate is None:
+                    self.unconverted.add(currency)
+                    rate = day_rates[day] = 1.0
+            cents[i] = round(cents[i] * rate)
+    
+    def __len__(self):
+        return len(self.rows)
+    
+    def approx_size(self):
+        """Estimated bytes held by the columns; the rows belong to the snapshot"""
+        columns = (self.days, self.months, self.cents, self.codes, self.kinds)
+        if self.use_numpy:
+            size = sum(column.nbytes for column in columns)
+        else:
+            # Day and month numbers are shared per date; each amount is its own int
+            size = sum(sys.getsizeof(column) for column in columns) + sys.getsizeof(2 ** 40) * len(self.cents)
+        return size + sys.getsizeof(self.rows._order) + sys.getsizeof(self.categories)
+    
+    def span(self, start=None, end=None):
+        """Positions [lo, hi) of rows whose date is within start..end (inclusive)"""
+        lo = bisect_left(self.date_keys, start) if start else 0
+        hi = bisect_right(self.date_keys, end) if end else len(self.date_keys)
+        return lo, max(lo, hi)
+    
+    def month_span(self, month):
+        """Positions of rows whose date starts with month (YYYY-MM)"""
+        return self.span(month, month + '\uffff')
+    
+    def _select(self, lo, hi, kind):
+        """Positions in [lo, hi) of the given kind"""
+        if self.use_numpy:
+            return lo + np.flatnonzero(self.kinds[lo:hi] == kind)
+        kinds = self.kinds
+        return [i for i in range(lo, hi) if kinds[i] == kind]
+    
+    def summarize(self, lo, hi, top_k=5):
+        """summarize_columns() over rows [lo, hi) in this process"""
+        return summarize_columns(self.days, self.cents, self.codes, self.kinds,
+                                 lo, hi, len(self.categories), top_k)
+    
+    def period_totals(self, lo, hi, summary=None):
+        """Expense/income totals (cents) and per-category expense totals for [lo, hi)"""
+        if summary is None:
+            summary = self.summarize(lo, hi, top_k=0)
+        counts, totals = summary['category_counts'], summary['category_cents']
+        return {
+            'expenses': summary['expense_cents'],
+            'income': summary['income_cents'],
+            'expense_count': summary['expense_count'],
+            'income_count': summary['income_count'],
+            'categories': {self.categories[c]: totals[c] for c in range(len(self.categories)) if counts[c]},
+        }
+    
+    def compare(self, periods):
+        """period_totals() for each (start, end) date pair"""
+        return [self.period_totals(*self.span(start, end)) for start, end in periods]
+    
+    def series(self, freq='monthly', kind=EXPENSE, start=None, end=None):
+        """Dense (keys, cents) totals per day, week or month over a date range.
+
+        Keys are day ordinals, week numbers (Monday-based, from ordinals)
+        or month numbers (year * 12 + month - 1).
+        """
+        positions = self._select(*self.span(start, end), kind)
+        if not len(positions):
+            return [], []
+        if self.use_numpy:
+            if freq == 'monthly':
+                buckets = self.months[positions]
+            else:
+                buckets = self.days[positions] if freq == 'daily' else (self.days[positions] - 1) // 7
+            first = int(buckets[0])
+            totals = np.bincount(buckets - first, weights=self.cents[positions])
+            return list(range(first, first + len(totals))), [int(t) for t in totals.tolist()]
+        if freq == 'monthly':
+            buckets = [self.months[i] for i in positions]
+        elif freq == 'daily':
+            buckets = [self.days[i] for i in positions]
+        else:
+            buckets = [(self.days[i] - 1) // 7 for i in positions]
+        first = buckets[0]
+        totals = [0] * (buckets[-1] - first + 1)
+        cents = self.cents
+        for bucket, i in zip(buckets, positions):
+            totals[bucket - first] += cents[i]
+        return list(range(first, first + len(totals))), totals
+    
+    def rolling_mean(self, values, window):
+        """Mean of each full window of values (cents in, float cents out)"""
+        if window <= 0 or len(values) < window:
+            return []
+        if self.use_numpy:
+            sums = np.cumsum(np.concatenate(([0], np.asarray(values, dtype=np.int64))))
+            return ((sums[window:] - sums[:-window]) / window).tolist()
+        means = []
+        running = sum(values[:window])
+        means.append(running / window)
+        for i in range(window, len(values)):
+            running += values[i] - values[i - window]
+            means.append(running / window)
+        return means
+    
+    def ewma(self, values, alpha=0.3):
+        """Exponentially weighted moving average of values.
+
+        The recursion is inherently sequential and runs on aggregated
+        series (one value per day/week/month), so both paths share it.
+        """
+        smoothed = []
+        current = None
+        for value in values:
+            current = value if current is None else alpha * value + (1 - alpha) * current
+            smoothed.append(current)
+        return smoothed
+    
+    def percentiles(self, qs, kind=EXPENSE):
+        """Linearly interpolated percentiles (in cents) of one kind's amounts"""
+        positions = self._select(0, len(self), kind)
+        if not len(positions):
+            return [None for _ in qs]
+        if self.use_numpy:
+            ordered = np.sort(self.cents[positions])
+        else:
+            ordered = sorted(self.cents[i] for i in positions)
+        last = len(ordered) - 1
+        result = []
+        for q in qs:
+            position = last * q / 100
+            lo = int(position)
+            hi = min(lo + 1, last)
+            low, high = int(ordered[lo]), int(ordered[hi])
+            result.append(low + (high - low) * (position - lo))
+        return result
+    
+    def dashboard(self, summary=None, percentiles=None):
+        """Whole-ledger statistics, or None when there are no expenses.
+
+        summary is a whole-ledger summarize() result with top_k >= 5, and
+        percentiles the expense percentiles((50, 90, 99)), for callers that
+        computed them elsewhere (e.g. in parallel).
+        """
+        if summary is None:
+            summary = self.summarize(0, len(self))
+        if not summary['expense_count']:
+            return None
+        
+        counts, totals = summary['category_counts'], summary['category_cents']
+        frequent = max(range(len(counts)), key=lambda c: counts[c])
+        expensive = max(range(len(totals)), key=lambda c: totals[c])
+        total_expense = summary['expense_cents']
+        expense_count = summary['expense_count']
+        first_day, last_day = summary['first_day'], summary['last_day']
+        top_5 = [i for _, i in summary['top'][:5]]
+        
+        # Compare average daily spend over the most recent window against
+        # the window before it (up to 30 days each).
+        trend = None
+        window = min(30, (last_day - first_day + 1) // 2)
+        if window >= 7:
+            _, daily = self.series('daily')
+            recent = sum(daily[-window:])
+            older = sum(daily[-2 * window:-window])
+            trend = (recent / window / 100, older / window / 100, window)
+        
+        return {
+            'total_expense': total_expense / 100,
+            'total_income': summary['income_cents'] / 100,
+            'expense_count': expense_count,
+            'avg_expense': total_expense / expense_count / 100,
+            'days_tracked': last_day - first_day + 1,
+            'highest': self.rows[top_5[0]],
+            'most_frequent_cat': (self.categories[frequent], counts[frequent]),
+            'most_expensive_cat': (self.categories[expensive], totals[expensive] / 100),
+            'category_count': sum(1 for c in counts if c),
+            'percentiles': [None if p is None else p / 100
+                            for p in percentiles or self.percentiles((50, 90, 99))],
+            'trend': trend,
+            'top_5': [self.rows[i] for i in top_5],
+        }
+
+
+def summarize_columns(days, cents, codes, kinds, lo, hi, category_count, top_k=5):
+    """Partial aggregate of rows [lo, hi) of the ledger columns.
+
+    Works on NumPy arrays or on any indexable columns (lists, memoryviews).
+    Amounts are integer cents and ties are broken by position, so merging
+    the partials of consecutive shards gives exactly the result of one
+    pass over the whole range.
+    """
+    EXPENSE, INCOME = AnalyticsEngine.EXPENSE, AnalyticsEngine.INCOME
+    if np is not None and isinstance(cents, np.ndarray):
+        kind_slice = kinds[lo:hi]
+        expense = lo + np.flatnonzero(kind_slice == EXPENSE)
+        income = lo + np.flatnonzero(kind_slice == INCOME)
+        amounts = cents[expense]
+        expense_codes = codes[expense]
+        category_counts = np.bincount(expense_codes, minlength=category_count).tolist()
+        category_cents = [int(t) for t in np.bincount(expense_codes, weights=amounts,
+                                                       minlength=category_count).tolist()]
+        top = []
+        smallest = None
+        if len(expense):
+            order = []
+            if top_k:
+                # Everything above the k-th largest amount, then the earliest
+                # rows equal to it, sorted: no full sort of the range
+                k = min(top_k, len(amounts))
+                kth = np.partition(amounts, len(amounts) - k)[len(amounts) - k]
+                above = np.flatnonzero(amounts > kth)
+                chosen = np.concatenate((above, np.flatnonzero(amounts == kth)[:k - len(above)]))
+                order = chosen[np.argsort(-amounts[chosen], kind='stable')]
+            top = [(int(amounts[j]), int(expense[j])) for j in order]
+            j = int(np.argmin(amounts))
+            smallest = (int(amounts[j]), int(expense[j]))
+        return {
+            'expense_cents': int(amounts.sum()),
+            'income_cents': int(cents[income].sum()),
+            'expense_count': len(expense),
+            'income_count': len(income),
+            'category_counts': category_counts,
+            'category_cents': category_cents,
+            'min': smallest,
+            'top': top,
+            'first_day': int(days[expense[0]]) if len(expense) else None,
+            'last_day': int(days[expense[-1]]) if len(expense) else None,
+        }
+    
+    expense_cents = income_cents = expense_count = income_count = 0
+    category_counts = [0] * category_count
+    category_cents = [0] * category_count
+    expense = []
+    for i in range(lo, hi):
+        kind = kinds[i]
+        if kind == EXPENSE:
+            amount = cents[i]
+            expense_cents += amount
+            expense_count += 1
+            category_counts[codes[i]] += 1
+            category_cents[codes[i]] += amount
+            expense.append(i)
+        elif kind == INCOME:
+            income_cents += cents[i]
+            income_count += 1
+    
+    top = [(cents[i], i) for i in sorted(expense, key=lambda i: -cents[i])[:top_k]] if top_k else []
+    smallest = None
+    if expense:
+        i = min(expense, key=lambda i: cents[i])
+        smallest = (cents[i], i)
+    return {
+        'expense_cents': expense_cents,
+        'income_cents': income_cents,
+        'expense_count': expense_count,
+        'income_count': income_count,
+        'category_counts': category_counts,
+        'category_cents': category_cents,
+        'min': smallest,
+        'top': top,
+        'first_day': days[expense[0]] if expense else None,
+        'last_day': days[expense[-1]] if expense else None,
+    }
+
+
+def merge_summaries(partials, top_k=5):
+    """Combine summarize_columns() results of consecutive shards"""
+    merged = dict(partials[0])
+    merged['category_counts'] = list(merged['category_counts'])
+    merged['category_cents'] = list(merged['category_cents'])
+    top = list(merged['top'])
+    for part in partials[1:]:
+        for key in ('expense_cents', 'income_cents', 'expense_count', 'income_count'):
+            merged[key] += part[key]
+        for c, count in enumerate(part['category_counts']):
+            merged['category_counts'][c] += count
+            merged['category_cents'][c] += part['category_cents'][c]
+        if part['min'] is not None and (merged['min'] is None or part['min'][0] < merged['min'][0]):
+            merged['min'] = part['min']
+        if merged['first_day'] is None:
+            merged['first_day'] = part['first_day']
+        if part['last_day'] is not None:
+            merged['last_day'] = part['last_day']
+        top.extend(part['top'])
+    merged['top'] = sorted(top, key=lambda t: (-t[0], t[1]))[:top_k]
+    return merged
+
+
+_attached_columns = {}
+
+
+def _attach_columns(names, length):
+    """Map shared column buffers into this worker without copying them"""
+    key = (names, length)
+    columns = _attached_columns.get(key)
+    if columns is None:
+        _attached_columns.clear()
+        segments = []
+        for name in names:
+            # Workers share the parent's resource tracker, so attaching does
+            # not take ownership; the parent unlinks the segments.
+            segments.append(shared_memory.SharedMemory(name=name))
+        if np is not None:
+            views = [np.ndarray((length,), dtype=np.int64, buffer=segment.buf) for segment in segments]
+        else:
+            views = [segment.buf[:length * 8].cast('q') for segment in segments]
+        columns = _attached_columns[key] = (segments, views)
+    return columns[1]
+
+
+def _summarize_shard(names, length, lo, hi, category_count, top_k):
+    days, cents, codes, kinds = _attach_columns(names, length)
+    return summarize_columns(days, cents, codes, kinds, lo, hi, category_count, top_k)
+
+
+class ParallelAggregator:
+    """Split aggregations over date-ordered shards across worker processes.
+
+    The engine's columns are copied once per ledger version into shared
+    memory; workers map them directly and return small partial results
+    (sums, counts, per-category totals, min and top-K) that are merged
+    here. Ranges under threshold rows, or machines with one core, take
+    the sequential path, which gives the same result.
+    
+    One aggregator (and its worker pool) may be shared by several
+    trackers; owner identifies whose columns are in shared memory, so a
+    tracker can release them when it closes.
+    """
+    
+    def __init__(self, max_workers=None, threshold=500_000, shards_per_worker=4):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.threshold = threshold
+        self.shards_per_worker = shards_per_worker
+        self._pool = None
+        self._segments = []
+        self._shared_engine = None
+        self._owner = None
+        self._lock = threading.Lock()
+    
+    def should_parallelize(self, rows):
+        return self.max_workers > 1 and rows >= self.threshold
+    
+    def summarize(self, engine, lo, hi, top_k=5, owner=None):
+        if not self.should_parallelize(hi - lo):
+            return engine.summarize(lo, hi, top_k)
+        
+        # Held until the partials are in: the segments must outlive the
+        # workers reading them, and one aggregation already fills the pool
+        with self._lock:
+            names = self._share(engine, owner)
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+            futures = [self._pool.submit(_summarize_shard, names, len(engine), start, end,
+                                         len(engine.categories), top_k)
+                       for start, end in self.shards(engine, lo, hi)]
+            try:
+                return merge_summaries([f.result() for f in futures], top_k)
+            except BrokenProcessPool:
+                # A worker died (e.g. killed for memory); drop the pool and
+                # answer from this process rather than failing the report.
+                self._pool = None
+                return engine.summarize(lo, hi, top_k)
+    
+    def shards(self, engine, lo, hi):
+        """Split [lo, hi) into runs of whole months of roughly equal size"""
+        count = self.max_workers * self.shards_per_worker
+        target = max(1, (hi - lo) // count)
+        months = engine.months
+        bounds = [lo]
+        while bounds[-1] < hi:
+            cut = min(bounds[-1] + target, hi)
+            if cut < hi:
+                # Move the cut forward to the first row of the next month
+                month = months[cut - 1]
+                if engine.use_numpy:
+                    cut += int(np.searchsorted(months[cut:hi], month, side='right'))
+                else:
+                    cut = bisect_right(months, month, cut, hi)
+            bounds.append(cut)
+        return list(zip(bounds[:-1], bounds[1:]))
+    
+    def _share(self, engine, owner):
+        if self._shared_engine is engine:
+            return tuple(segment.name for segment in self._segments)
+        self._release_segments()
+        length = len(engine)
+        for column in (engine.days, engine.cents, engine.codes, engine.kinds):
+            segment = shared_memory.SharedMemory(create=True, size=max(8, length * 8))
+            if np is not None:
+                np.ndarray((length,), dtype=np.int64, buffer=segment.buf)[:] = column
+            else:
+                segment.buf[:length * 8] = array('q', column).tobytes()
+            self._segments.append(segment)
+        self._shared_engine = engine
+        self._owner = owner
+        return tuple(segment.name for segment in self._segments)
+    
+    def shared_bytes(self, owner):
+        """Bytes of shared memory holding owner's columns"""
+        with self._lock:
+            return sum(segment.size for segment in self._segments) if self._owner is owner else 0
+    
+    def release(self, owner):
+        """Free the shared copy of owner's columns, if they are the ones shared"""
+        with self._lock:
+            if self._owner is owner:
+                self._release_segments()
+    
+    def _release_segments(self):
+        for segment in self._segments:
+            segment.close()
+            segment.unlink()
+        self._segments = []
+        self._shared_engine = None
+        self._owner = None
+    
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+            self._release_segments()
+
+
+class BlockLedgerStore:
+    """Ledger rows in compressed blocks with a date index (.pledger files).
+
+    Rows are kept in write order and packed block_rows at a time as CSV
+    text compressed with zlib or lzma. The file is laid out as
+
+        MAGIC | block | block | ... | index (JSON) | index offset, length | MAGIC
+
+    where the index lists (first date, last date, row count, offset,
+    length) per block. Reads bounded by date decompress only the blocks
+    whose date range overlaps. The last block stays open: appends
+    recompress it together with the index, and it is sealed once it
+    holds block_rows rows, so an append never rewrites sealed blocks.
+    
+    An append never overwrites bytes the current index refers to: it
+    writes its blocks and a new index after the end of the file, so a
+    crash part-way leaves the previous index intact, and opening the file
+    falls back to the last complete index. The open block and index an
+    append replaces are left behind as dead space, which is reclaimed by
+    copying the live blocks to a new file once it outgrows the live data.
+    """
+    MAGIC = b'PLEDGER1'
+    FOOTER = struct.Struct('<QI')
+    COMPACT_MIN_BYTES = 1 << 20
+    CODECS = {
+        'zlib': (lambda data: zlib.compress(data, 6), zlib.decompress),
+        'lzma': (lzma.compress, lzma.decompress),
+    }
+    
+    def __init__(self, path, fields, block_rows=4096, codec='zlib'):
+        if codec not in self.CODECS:
+            raise ValueError(f"Unknown codec: {codec}")
+        self.path = path
+        self.fields = list(fields)
+        self.block_rows = block_rows
+        self.codec = codec
+        self.blocks = []
+        self._tail = []
+        self._tail_loaded = True
+        self._end = len(self.MAGIC)
+        self._dead = 0
+        if os.path.exists(path):
+            self._read_index()
+    
+    def __len__(self):
+        return sum(block[2] for block in self.blocks) + len(self._tail)
+    
+    def reload(self):
+        """Pick up appends another process made since the index was read"""
+        if os.path.exists(self.path):
+            self._read_index()
+    
+    def _read_index(self):
+        with open(self.path, 'rb') as f:
+            if f.read(len(self.MAGIC)) != self.MAGIC:
+                raise ValueError(f"{self.path} is not a block ledger")
+            end = f.seek(0, os.SEEK_END)
+            found = self._index_ending_at(f, end)
+            if found is None:
+                # An append cut short leaves a partial write after the last
+                # complete index; the next append writes over it
+                end, found = self._last_index(f, end)
+        length, index = found
+        self.fields = index['fields']
+        self.codec = index['codec']
+        self.block_rows = index['block_rows']
+        self.blocks = [tuple(block) for block in index['blocks']]
+        self._tail = []
+        self._tail_loaded = not index['open_tail']
+        self._end = end
+        self._dead = end - self._live_bytes(length)
+    
+    def _index_ending_at(self, f, end):
+        """(length, index) of a complete index whose footer ends at end, else None"""
+        size = self.FOOTER.size + len(self.MAGIC)
+        if end < len(self.MAGIC) + size:
+            return None
+        f.seek(end - size)
+        footer = f.read(size)
+        if footer[self.FOOTER.size:] != self.MAGIC:
+            return None
+        offset, length = self.FOOTER.unpack(footer[:self.FOOTER.size])
+        if offset < len(self.MAGIC) or offset + length != end - size:
+            return None
+        f.seek(offset)
+        try:
+            return length, json.loads(f.read(length))
+        except ValueError:
+            return None
+    
+    def _last_index(self, f, end, chunk=1 << 20):
+        """(end, (length, index)) of the last complete index before end"""
+        pos = end
+        while pos > len(self.MAGIC):
+            start = max(len(self.MAGIC), pos - chunk)
+            f.seek(start)
+            # Overlap the next chunk so a MAGIC split across chunks is seen
+            data = f.read(pos - start + len(self.MAGIC) - 1)
+            hit = data.rfind(self.MAGIC)
+            while hit != -1:
+                candidate = start + hit + len(self.MAGIC)
+                if candidate <= end:
+                    found = self._index_ending_at(f, candidate)
+                    if found is not None:
+                        return candidate, found
+                hit = data.rfind(self.MAGIC, 0, hit + len(self.MAGIC) - 1)
+            pos = start
+        raise ValueError(f"{self.path} is truncated or damaged")
+    
+    def _live_bytes(self, index_length):
+        """Bytes the current index refers to, including itself and the header"""
+        return (len(self.MAGIC) + sum(block[4] for block in self.blocks) + index_length
+                + self.FOOTER.size + len(self.MAGIC))
+    
+    def _encode(self, rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return self.CODECS[self.codec][0](buffer.getvalue().encode('utf-8'))
+    
+    def _decode(self, payload):
+        text = self.CODECS[self.codec][1](payload).decode('utf-8')
+        return list(csv.reader(io.StringIO(text, newline='')))
+    
+    def _block(self, rows, offset, payload):
+        dates = [row[1] for row in rows]
+        return (min(dates), max(dates), len(rows), offset, len(payload))
+    
+    def _read_block(self, f, block):
+        f.seek(block[3])
+        return self._decode(f.read(block[4]))
+    
+    def _load_tail(self):
+        """Bring the open block's rows into memory before appending to it"""
+        if self._tail_loaded:
+            return
+        with open(self.path, 'rb') as f:
+            self._tail = self._read_block(f, self.blocks.pop())
+        self._tail_loaded = True
+    
+    def _write_index(self, f, open_tail):
+        """Write the index and footer at the current position; returns the index length"""
+        index = json.dumps({
+            'codec': self.codec,
+            'fields': self.fields,
+            'block_rows': self.block_rows,
+            'open_tail': open_tail,
+            'blocks': self.blocks,
+        }).encode('utf-8')
+        offset = f.tell()
+        f.write(index)
+        f.write(self.FOOTER.pack(offset, len(index)) + self.MAGIC)
+        return len(index)
+    
+    def _write_from(self, f, rows, sync=False):
+        """Write rows as blocks at the current position, then the index.
+
+        Full blocks are sealed; the remainder (and any rows already in the
+        open block) become the new open block. With sync, the blocks reach
+        the disk before the index that refers to them. Anything after the
+        new index is cut off only once it is written. Returns bytes written.
+        """
+        start = f.tell()
+        pending = self._tail
+        for row in rows:
+            pending.append([str(value) for value in row])
+            if len(pending) == self.block_rows:
+                payload = self._encode(pending)
+                self.blocks.append(self._block(pending, f.tell(), payload))
+                f.write(payload)
+                pending = []
+        self._tail = pending
+        if pending:
+            payload = self._encode(pending)
+            self.blocks.append(self._block(pending, f.tell(), payload))
+            f.write(payload)
+        if sync:
+            f.flush()
+            os.fsync(f.fileno())
+        index_length = self._write_index(f, bool(pending))
+        self._end = f.tell()
+        self._dead = self._end - self._live_bytes(index_length)
+        if pending:
+            # The open block is listed in the index but kept in memory
+            self.blocks.pop()
+        f.truncate()
+        return self._end - start
+    
+    def read(self, start=None, end=None):
+        """Rows (as dicts) whose Date is within start..end, in write order"""
+        fields = self.fields
+        blocks = list(self.blocks)
+        tail = list(self._tail)
+        with open(self.path, 'rb') as f:
+            for block in blocks:
+                if (start and block[1] < start) or (end and block[0] > end):
+                    continue
+                yield from self._rows(self._read_block(f, block), fields, start, end)
+        if tail:
+            yield from self._rows(tail, fields, start, end)
+    
+    def _rows(self, rows, fields, start, end):
+        for row in rows:
+            date = row[1]
+            if (start and date < start) or (end and date > end):
+                continue
+            yield dict(zip(fields, row))
+    
+    def append(self, rows):
+        """Append rows (sequences in field order); returns bytes written"""
+        self._load_tail()
+        with open(self.path, 'r+b') as f:
+            f.seek(self._end)
+            written = self._write_from(f, rows, sync=True)
+        if self._dead > max(self.COMPACT_MIN_BYTES, self._end - self._dead):
+            self.compact()
+        return written
+    
+    def compact(self):
+        """Copy the live blocks to a new file, dropping space left by earlier appends"""
+        self._load_tail()
+        temp = self.path + '.tmp'
+        with open(self.path, 'rb') as source, open(temp, 'wb') as f:
+            f.write(self.MAGIC)
+            blocks = []
+            for block in self.blocks:
+                source.seek(block[3])
+                blocks.append(block[:3] + (f.tell(), block[4]))
+                f.write(source.read(block[4]))
+            self.blocks = blocks
+            self._write_from(f, [])
+        os.replace(temp, self.path)
+    
+    def rewrite(self, rows, fields=None):
+        """Replace every row (sequences in field order), and the fields when
+        given; returns bytes written"""
+        temp = self.path + '.tmp'
+        if fields is not None:
+            self.fields = list(fields)
+        self.blocks = []
+        self._tail = []
+        self._tail_loaded = True
+        with open(temp, 'wb') as f:
+            f.write(self.MAGIC)
+            self._write_from(f, rows)
+            written = f.tell()
+        os.replace(temp, self.path)
+        return written
+    
+    def stats(self):
+        return {
+            'blocks': len(self.blocks) + (1 if self._tail else 0),
+            'rows': len(self),
+            'bytes': os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+            'dead_bytes': self._dead,
+            'codec': self.codec,
+        }
+    
+    @classmethod
+    def from_csv(cls, csv_path, path, block_rows=4096, codec='zlib', fields=None, defaults=None):
+        """Build a block ledger at path from a CSV ledger.
+
+        With fields, the CSV's columns are matched by name and stored in
+        that order; columns it lacks are filled from defaults (or left
+        empty), so older ledgers come out in the current layout.
+        """
+        with open(csv_path, 'r', newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            rows = reader
+            if fields is None:
+                fields = header
+            elif fields != header:
+                defaults = defaults or {}
+                columns = [header.index(name) if name in header else None for name in fields]
+                filler = [defaults.get(name, '') for name in fields]
+                rows = ([row[c] if c is not None and c < len(row) else filler[i]
+                         for i, c in enumerate(columns)] for row in reader)
+            store = cls(path, fields, block_rows, codec)
+            # Converting over an existing file replaces its layout too
+            store.block_rows, store.codec = block_rows, codec
+            store.rewrite(rows, fields)
+        return store
+    
+    def export_csv(self, csv_path, start=None, end=None):
+        """Write the rows (optionally only start..end) as a CSV ledger"""
+        with open(csv_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(self.fields)
+            writer.writerows([row[field] for field in self.fields] for row in self.read(start, end))
+        return csv_path
+
+
+class ChangeFeed:
+    """Append-only log of ledger changes, one JSON record per line.
+
+    Every record has a sequence number one higher than the previous, the
+    time and an op: 'add', 'edit' and 'delete' for entries (by ID), and
+    'budgets' and 'recurring' carrying the complete new state. Applying a
+    record twice gives the same result as applying it once.
+    
+    Once the file grows past max_bytes it is rotated: renamed to path.1
+    (replacing the previous one) and continued in a new file, so a reader
+    that is at most one file behind can still finish the old one.
+    
+    A write cut short by a crash leaves a partial last line. Readers skip
+    lines that do not decode, and the next record starts on a new line, so
+    the partial one is never joined to it.
+    """
+    
+    def __init__(self, path, max_bytes=None):
+        self.path = path
+        self.rotated_path = path + ".1"
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._torn = self._ends_partway()
+        self.seq = self.last_seq()
+    
+    def _ends_partway(self):
+        """Whether the file ends in the middle of a line"""
+        try:
+            with open(self.path, 'rb') as f:
+                if f.seek(0, os.SEEK_END) == 0:
+                    return False
+                f.seek(-1, os.SEEK_END)
+                return f.read(1) != b'\n'
+        except FileNotFoundError:
+            return False
+    
+    def last_seq(self):
+        """Sequence number of the last complete record, in the rotated file if
+        the current one has none yet"""
+        return self._last_seq(self.path) or self._last_seq(self.rotated_path)
+    
+    def _last_seq(self, path):
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            return 0
+        with f:
+            size = f.seek(0, os.SEEK_END)
+            chunk = 4096
+            while True:
+                start = max(0, size - chunk)
+                f.seek(start)
+                lines = f.read(size - start).split(b'\n')
+                # The first line may be cut by the seek and the last one is
+                # either empty or a record still being written
+                complete = lines[:-1] if start == 0 else lines[1:-1]
+                for line in reversed(complete):
+                    record = self._decode(line)
+                    if record is not None:
+                        return record['seq']
+                if start == 0:
+                    return 0
+                chunk *= 2
+    
+    @staticmethod
+    def _decode(line):
+        """The record on line, or None for a partial or garbled one"""
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return None
+        if not isinstance(record, dict) or not isinstance(record.get('seq'), int):
+            return None
+        return record
+    
+    def size(self):
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+    
+    def first_seq(self, path=None):
+        """Sequence number of the first record in the current (or given) file,
+        which tells rotated files apart; None if it has none yet"""
+        for record, _ in self.read(0, path):
+            return record['seq']
+        return None
+    
+    def emit(self, op, **fields):
+        """Append a record and return its sequence number"""
+        with self._lock:
+            self.seq += 1
+            record = {'seq': self.seq, 'time': datetime.now().isoformat(timespec='seconds'), 'op': op, **fields}
+            with open(self.path, 'a') as f:
+                if self._torn:
+                    # End the partial line left by a crash
+                    f.write('\n')
+                    self._torn = False
+                f.write(json.dumps(record) + '\n')
+                full = self.max_bytes and f.tell() >= self.max_bytes
+            if full:
+                os.replace(self.path, self.rotated_path)
+            return self.seq
+    
+    def read(self, offset=0, path=None):
+        """(record, offset after it) for each complete record from byte offset on,
+        skipping lines that do not decode"""
+        try:
+            f = open(path or self.path, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    return
+                offset += len(line)
+                record = self._decode(line)
+                if record is not None:
+                    yield record, offset
+
+
+class LedgerReplica:
+    """Read-only copy of a ledger kept current from its change feed.
+
+    Holds the entries by ID along with the budgets and recurring entries,
+    and the sequence number and feed offset of the last change applied.
+    poll() reads only the records after that point. checkpoint() saves the
+    state next to the checkpoint path (entries as a block ledger, the rest
+    as JSON), so a restarted replica resumes from its sequence number
+    instead of reloading the primary's files.
+    """
+    
+    def __init__(self, feed, checkpoint, fields):
+        self.feed = feed
+        self.rows_file = checkpoint + ".pledger"
+        self.state_file = checkpoint + ".json"
+        self.fields = fields
+        self.rows = {}
+        self.budgets = {}
+        self.recurring = []
+        self.seq = 0
+        self.offset = 0
+        self.first = None
+    
+    def bootstrap(self, rows, budgets, recurring, seq):
+        """Start from a full copy of the primary read after the feed reached seq"""
+        self.rows = {row['ID']: row for row in rows}
+        self.budgets = budgets
+        self.recurring = list(recurring)
+        self.seq = seq
+        self.offset = 0
+        self.first = None
+    
+    def restore(self):
+        """Load the last checkpoint; False if there is none"""
+        try:
+            with open(self.state_file, 'r') as f:
+                state = json.load(f)
+            store = BlockLedgerStore(self.rows_file, self.fields)
+        except:
+            return False
+        self.rows = {row['ID']: row for row in store.read()}
+        self.budgets = state['budgets']
+        self.recurring = state['recurring']
+        self.seq = state['seq']
+        self.offset = state['offset']
+        self.first = state.get('first')
+        return True
+    
+    def checkpoint(self):
+        # Rows first: if the state write is lost, replaying from the older
+        # sequence number over the newer rows is harmless.
+        BlockLedgerStore(self.rows_file, self.fields).rewrite(
+            ([row.get(field, '') for field in self.fields] for row in self.rows.values()), self.fields)
+        temp = self.state_file + ".tmp"
+        with open(temp, 'w') as f:
+            json.dump({'seq': self.seq, 'offset': self.offset, 'first': self.first, 'budgets': self.budgets,
+                       'recurring': self.recurring}, f)
+        os.replace(temp, self.state_file)
+    
+    def poll(self):
+        """Apply new feed records; returns (records applied, months touched, rows appended).
+
+        rows appended lists the new entries, in order, when every change
+        to entries was an addition, and is None otherwise. A feed rotated
+        since the last poll is finished from its rotated file first; one
+        rotated twice, or truncated, raises ValueError.
+        """
+        applied = 0
+        touched = set()
+        appended = []
+        paths = [None]
+        if self.offset and self.feed.first_seq() != self.first:
+            if self.feed.first_seq(self.feed.rotated_path) != self.first:
+                raise ValueError("change feed was rotated more than once since the last sync")
+            paths = [self.feed.rotated_path, None]
+        elif self.feed.size() < self.offset:
+            raise ValueError("change feed was truncated")
+        
+        for path in paths:
+            if path is None and len(paths) > 1:
+                self.offset = 0
+            for record, offset in self.feed.read(self.offset, path):
+                if self.offset == 0:
+                    self.first = record['seq']
+                self.offset = offset
+                if record['seq'] <= self.seq:
+                    continue
+                if record['seq'] != self.seq + 1:
+                    raise ValueError(f"change feed skips from {self.seq} to {record['seq']}")
+                appended = self._apply(record, touched, appended)
+                self.seq = record['seq']
+                applied += 1
+        return applied, touched, appended
+    
+    def _apply(self, record, touched, appended):
+        """Apply one record; returns appended plus the row it added, or None once
+        a record changed existing entries"""
+        op = record['op']
+        if op in ('add', 'edit'):
+            row = record['row']
+            previous = self.rows.get(row['ID'])
+            if previous is not None:
+                touched.add(previous['Date'][:7])
+                appended = None
+            elif appended is not None:
+                appended.append(row)
+            self.rows[row['ID']] = row
+            touched.add(row['Date'][:7])
+        elif op == 'delete':
+            previous = self.rows.pop(record['id'], None)
+            if previous is not None:
+                touched.add(previous['Date'][:7])
+                appended = None
+        elif op == 'budgets':
+            self.budgets = record['budgets']
+        elif op == 'recurring':
+            self.recurring = record['recurring']
+        return appended
+
+
+class BudgetStore:
+    """Category budgets indexed by month.
+
+    months maps 'YYYY-MM' to {category: amount}. templates maps a category
+    to an amount that applies to every month without its own budget for
+    that category. Older budgets.json files stored flat 'YYYY-MM:category'
+    keys; those are read as month budgets, and keys or amounts that cannot
+    be read are listed in skipped instead of failing the whole file.
+    """
+    
+    def __init__(self, months=None, templates=None):
+        self.months = months or {}
+        self.templates = templates or {}
+        self.skipped = []
+    
+    @classmethod
+    def from_json(cls, data):
+        if 'months' in data or 'templates' in data:
+            months = {m: {c: float(a) for c, a in cats.items()} for m, cats in data.get('months', {}).items()}
+            templates = {c: float(a) for c, a in data.get('templates', {}).items()}
+            return cls(months, templates)
+        
+        months = defaultdict(dict)
+        skipped = []
+        for key, amount in data.items():
+            # The month never contains a colon, so split once to keep
+            # categories such as "Bills: Water" intact.
+            month, colon, category = key.partition(':')
+            try:
+                if not colon:
+                    raise ValueError(key)
+                months[month][category] = float(amount)
+            except (TypeError, ValueError):
+                skipped.append(key)
+        store = cls(dict(months))
+        store.skipped = skipped
+        return store
+    
+    def to_json(self):
+        return {'months': self.months, 'templates': self.templates}
+    
+    def __len__(self):
+        return sum(len(cats) for cats in self.months.values()) + len(self.templates)
+    
+    def get(self, month, category):
+        """Budget for category in month, falling back to its template"""
+        amount = self.months.get(month, {}).get(category)
+        if amount is None:
+            amount = self.templates.get(category)
+        return amount
+    
+    def for_month(self, month):
+        """All budgets that apply to month, as {category: amount}"""
+        budgets = dict(self.templates)
+        budgets.update(self.months.get(month, {}))
+        return budgets
+    
+    def set(self, month, category, amount):
+        self.months.setdefault(month, {})[category] = amount
+    
+    def set_template(self, category, amount):
+        self.templates[category] = amount
+    
+    def delete(self, month, category):
+        """Remove a month budget, or a template when month is None"""
+        if month is None:
+            return self.templates.pop(category, None) is not None
+        cats = self.months.get(month, {})
+        removed = cats.pop(category, None) is not None
+        if not cats:
+            self.months.pop(month, None)
+        return removed
+    
+    def entries(self):
+        """(month, category, amount) for every budget; month is None for templates"""
+        items = [(None, c, a) for c, a in sorted(self.templates.items())]
+        for month in sorted(self.months):
+            items.extend((month, c, a) for c, a in sorted(self.months[month].items()))
+        return items
+
+
+class BudgetMonitor:
+    """Running per-month category spend that reports budget threshold crossings.
+
+    A month's totals are seeded from the ledger the first time an
+    expense is recorded against a budget in it; after that each written
+    expense only updates one counter, so checking a budget on add no
+    longer rescans the ledger. Expenses without a budget never seed one.
+    """
+    THRESHOLDS = (80, 100)
+    
+    def __init__(self, budgets, seed):
+        self._budgets = budgets
+        self._seed = seed
+        self._spent = {}
+    
+    def reset(self):
+        """Forget running totals (after entries were edited or removed)"""
+        self._spent = {}
+    
+    def record(self, date, category, amount):
+        """Count an expense already in the ledger and return the threshold event it triggers, if any"""
+        month = date[:7]
+        cents = round(float(amount) * 100)
+        budget = self._budgets().get(month, category)
+        totals = self._spent.get(month)
+        if totals is None:
+            if not budget:
+                return None
+            # Seeded from the ledger, which already holds this expense
+            totals = self._spent[month] = dict(self._seed(month))
+            after = totals.get(category, 0)
+        else:
+            after = totals[category] = totals.get(category, 0) + cents
+        before = after - cents
+        
+        if not budget:
+            return None
+        limit = round(budget * 100)
+        crossed = [t for t in self.THRESHOLDS if before * 100 < t * limit <= after * 100]
+        if not crossed:
+            return None
+        return {
+            'month': month,
+            'category': category,
+            'threshold': crossed[-1],
+            'spent': after / 100,
+            'budget': budget,
+            'percentage': after / limit * 100,
+        }
+
+
+class Cancelled(Exception):
+    """A background task was stopped part-way"""
+
+
+class WarmupWorker:
+    """Precompute likely next reports on a background thread while the user is idle.
+
+    tasks is a list of (name, func) pairs; each func(snapshot) is run once
+    per ledger version, and is expected to leave its result in the report
+    cache or the snapshot's derived values. The worker only starts a task
+    while the foreground is idle (between idle() and busy()), and long
+    loops call yield_to_foreground(), where a task in flight pauses until
+    the foreground is idle again, so a menu action never shares the
+    interpreter with it. settle() lets a task in flight finish instead, so
+    its result is reused rather than computed twice. cancel() stops the
+    task in flight at its next such check.
+    
+    With a profiler, calls made by the tasks are left out of its stats.
+    """
+    current = threading.local()
+    
+    def __init__(self, snapshot, tasks, profiler=None):
+        self._snapshot = snapshot
+        self.tasks = tasks
+        self.profiler = profiler
+        self.completed = 0
+        self.failed = 0
+        self._done = {}
+        self._running = None
+        self._idle = threading.Event()
+        self._settling = False
+        self._stopped = False
+        self._cond = threading.Condition()
+        self._thread = None
+    
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="warmup", daemon=True)
+        self._thread.start()
+    
+    def idle(self):
+        """The foreground is waiting for input: precompute until busy()"""
+        with self._cond:
+            self._idle.set()
+            self._cond.notify_all()
+    
+    def busy(self):
+        """Foreground work is starting: pause the task in flight, begin no new ones"""
+        self._idle.clear()
+    
+    def settle(self, timeout=None):
+        """Let the task in flight, if any, finish and wait for it; False if it
+        is still running after timeout"""
+        with self._cond:
+            self._settling = True
+            self._cond.notify_all()
+            try:
+                return self._cond.wait_for(lambda: self._running is None, timeout)
+            finally:
+                self._settling = False
+    
+    def checkpoint(self):
+        """Wait while the foreground is busy (unless it is settling); raise
+        Cancelled once cancel() was called"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._stopped or self._settling or self._idle.is_set())
+            if self._stopped:
+                raise Cancelled()
+    
+    def cancel(self):
+        with self._cond:
+            self._stopped = True
+            self._idle.set()
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+    
+    def _next(self):
+        snapshot = self._snapshot()
+        for name, func in self.tasks:
+            if self._done.get(name) != snapshot.version:
+                return name, func, snapshot
+        return None
+    
+    def _loop(self):
+        WarmupWorker.current.worker = self
+        if self.profiler is not None:
+            self.profiler.ignore_current_thread()
+        while True:
+            self._idle.wait()
+            with self._cond:
+                if self._stopped:
+                    return
+                task = self._next() if self._idle.is_set() else None
+                if task is None:
+                    # Everything is warm (or the foreground took over); sleep
+                    # until the next idle() or cancel()
+                    self._cond.wait()
+                    continue
+                name, func, snapshot = task
+                self._running = name
+            try:
+                func(snapshot)
+                self.completed += 1
+            except Cancelled:
+                with self._cond:
+                    self._running = None
+                    self._cond.notify_all()
+                return
+            except Exception:
+                # Best effort: the foreground reports errors when it runs the view
+                self.failed += 1
+            with self._cond:
+                self._done[name] = snapshot.version
+                self._running = None
+                self._cond.notify_all()
+
+
+def yield_to_foreground():
+    """Checkpoint for long loops: on a warm-up thread, pause while the
+    foreground is busy and stop once the worker is cancelled"""
+    worker = getattr(WarmupWorker.current, 'worker', None)
+    if worker is not None:
+        worker.checkpoint()
+
+
 class ExpenseTracker:
+    FIELDS = ['ID', 'Date', 'Amount', 'Category', 'Note', 'Type', 'Currency']
+    
     def __init__(self, filename="expenses.csv", budgets_file="budgets.json", 
-                 recurring_file="recurring.json", config_file="config.json"):
+                 recurring_file="recurring.json", config_file="config.json", profile=False,
+                 rates_file="rates.json", feed_file=None, replica=None, aggregator=None):
         self.filename = filename
         self.budgets_file = budgets_file
         self.recurring_file = recurring_file
         self.config_file = config_file
-        
-        self.expenses = []
-        self.budgets = {}
+        self.rates_file = rates_file
+        
+        self._write_lock = threading.RLock()
+        self._snapshot = LedgerSnapshot(0, ())
+        self._report_pool = None
+        self._exports = []
+        # A shared aggregator (see LedgerRegistry) is closed by its owner, not here
+        self._aggregator = aggregator
+        self._owns_aggregator = aggregator is None
+        self.budgets = BudgetStore()
+        self._budget_monitor = BudgetMonitor(lambda: self.budgets, self._month_category_cents)
         self.recurring_expenses = []
+        # JSON last read from or written to the budgets and recurring files
+        self._persisted = {}
         self.config = self._load_config()
+        self.profiler = Profiler(profile or self.config['profiling'])
+        self._report_cache = ReportCache(self.config.get('report_cache_size', 256))
+        self.rates = RateTable.load(self.rates_file, self.config['base_currency'])
+        self._store = None
+        if filename.endswith('.pledger'):
+            self._store = BlockLedgerStore(filename, self.FIELDS, codec=self.config.get('block_codec', 'zlib'))
+        # The feed belongs to the ledger: by default it sits next to it, named
+        # after it; False turns it off
+        if feed_file is None:
+            feed_file = os.path.splitext(filename)[0] + ".changes.jsonl"
+        self._feed = ChangeFeed(feed_file, self.config.get('feed_max_bytes')) if feed_file else None
+        self._replica = None
+        self._unsaved_changes = 0
+        self._warmup = None
+        
+        if replica:
+            # A replica never writes the primary's files; it follows the feed
+            if self._feed is None:
+                raise ValueError("A replica needs the primary's change feed")
+            self._replica = LedgerReplica(self._feed, replica, self.FIELDS)
+            if not self._replica.restore():
+                self._bootstrap_replica()
+            self._apply_replica(None)
+            self.sync()
+            return
         
         self._initialize_files()
         self._load_expenses()
@@ -43,17 +1988,189 @@ class ExpenseTracker:
         self._load_recurring()
         self._process_recurring_expenses()
     
+    @property
+    def expenses(self):
+        """Rows of the current ledger version (read-only tuple)"""
+        return self._snapshot.rows
+    
+    def snapshot(self):
+        """Pin the current ledger version for a consistent read"""
+        return self._snapshot
+    
+    def _publish(self, rows, touched=None):
+        """Swap in a new ledger version built from rows.
+
+        touched lists the months (YYYY-MM) whose entries changed; None
+        means any month may have changed. Writers hold _write_lock from
+        reading the current version until they publish the next one, so
+        concurrent writes never allocate the same ID or drop each other.
+        """
+        with self._write_lock:
+            self._snapshot = LedgerSnapshot(self._snapshot.version + 1, rows, self._generations(touched))
+            return self._snapshot
+    
+    def _publish_appended(self, added, touched):
+        """Publish the current version plus added rows at the end, extending
+        its date index and analytics columns rather than rebuilding them"""
+        with self._write_lock:
+            snapshot = self._snapshot
+            self._snapshot = snapshot.extended(snapshot.version + 1, added, self._generations(touched))
+            return self._snapshot
+    
+    def _generations(self, touched):
+        generations = dict(self._snapshot.generations)
+        for month in ('*',) if touched is None else touched:
+            generations[month] = generations.get(month, 0) + 1
+        return generations
+    
+    def _emit(self, op, **fields):
+        """Record a change in the change feed, if there is one"""
+        if self._feed is not None:
+            self._feed.emit(op, **fields)
+    
+    def _bootstrap_replica(self):
+        """Seed the replica from the primary's files, read as they are (never upgraded)"""
+        seq = self._feed.last_seq()
+        if self._store is not None:
+            self._store.reload()
+        rows, _ = self._read_expenses()
+        self._load_budgets()
+        self._load_recurring()
+        self._replica.bootstrap(rows, self.budgets.to_json(), self.recurring_expenses, seq)
+        self._unsaved_changes += 1
+    
+    def _apply_replica(self, touched, appended=None):
+        """Publish the replica's state. appended lists the rows a sync only
+        added, which extend the current version; None means rebuild it."""
+        replica = self._replica
+        if appended is None:
+            self._publish(replica.rows.values(), touched)
+        elif appended:
+            self._publish_appended(appended, touched)
+        self.budgets = BudgetStore.from_json(replica.budgets)
+        self.recurring_expenses = replica.recurring
+    
+    def sync(self):
+        """Apply new changes from the primary's feed (replica mode); returns how many"""
+        if self._replica is None:
+            return 0
+        try:
+            applied, touched, appended = self._replica.poll()
+        except ValueError as e:
+            print(f"{Colors.YELLOW}Reloading replica from {self.filename}: {e}{Colors.RESET}")
+            self._bootstrap_replica()
+            try:
+                applied, _, _ = self._replica.poll()
+            except ValueError:
+                # The feed moved on again while reloading; the next sync retries
+                applied = 0
+            # The reloaded copy is published even when no change followed it
+            self._apply_replica(None)
+            return applied
+        if applied:
+            self._apply_replica(touched, appended)
+            self._unsaved_changes += applied
+            if self._unsaved_changes >= self.config.get('replica_checkpoint_every', 1000):
+                self.checkpoint()
+        return applied
+    
+    def checkpoint(self):
+        """Save the replica's state so a restart resumes from the current change"""
+        if self._replica is not None and self._unsaved_changes:
+            self._replica.checkpoint()
+            self._unsaved_changes = 0
+    
+    def _warmup_tasks(self):
+        """Views worth precomputing while the user is idle, most likely first"""
+        month = lambda: datetime.now().strftime("%Y-%m")
+        return [
+            ('analytics', self._analytics),
+            ('month_summary', lambda snapshot: self._month_summary(snapshot, month())),
+            ('budget_status', lambda snapshot: self._budget_status(snapshot, month())),
+            ('dashboard', self._dashboard_stats),
+            ('monthly_trend', self._monthly_trend),
+        ]
+    
+    def submit_report(self, func, *args, snapshot=None):
+        """Run func(snapshot, *args) on the report pool, against the current version by default"""
+        if snapshot is None:
+            snapshot = self.snapshot()
+        if self._report_pool is None:
+            self._report_pool = ThreadPoolExecutor(max_workers=max(2, min(4, os.cpu_count() or 1)),
+                                                   thread_name_prefix="report")
+        return self._report_pool.submit(func, snapshot, *args)
+    
+    def _report_exports(self):
+        """Print the outcome of background exports that have finished"""
+        pending = []
+        for filename, future in self._exports:
+            if not future.done():
+                pending.append((filename, future))
+            elif future.exception() is not None:
+                print(f"{Colors.RED}Export to {filename} failed: {future.exception()}{Colors.RESET}")
+            else:
+                print(f"{Colors.GREEN}✓ Exported to {filename}{Colors.RESET}")
+        self._exports = pending
+    
+    def memory_footprint(self):
+        """Approximate bytes held by the loaded ledger: rows, indexes and
+        columns derived from them, cached reports and shared-memory columns"""
+        size = self._snapshot.approx_size() + self._report_cache.approx_size()
+        if self._aggregator is not None:
+            size += self._aggregator.shared_bytes(self)
+        return size
+    
+    def flush(self):
+        """Persist budgets and recurring entries changed in memory since they were
+        last read or saved (a replica never writes)"""
+        if self._replica is not None:
+            return
+        self._write_state('budgets', self.budgets_file, self.budgets.to_json())
+        self._write_state('recurring', self.recurring_file, self.recurring_expenses)
+    
+    def close(self):
+        """Stop warm-up, wait for running reports, release the pools and checkpoint a replica"""
+        if self._warmup is not None:
+            self._warmup.cancel()
+            self._warmup = None
+        self.checkpoint()
+        if self._report_pool is not None:
+            self._report_pool.shutdown(wait=True)
+            self._report_pool = None
+            self._report_exports()
+        if self._aggregator is not None and self._owns_aggregator:
+            self._aggregator.close()
+            self._aggregator = None
+        elif self._aggregator is not None:
+            self._aggregator.release(self)
+    
     def _load_config(self):
+        return self.read_config(self.config_file)
+    
+    @staticmethod
+    def read_config(config_file="config.json"):
+        """Settings from config_file over the defaults"""
         default_config = {
             "use_colors": True,
             "currency_symbol": "$",
+            "base_currency": "USD",
             "date_format": "%Y-%m-%d",
-            "backup_enabled": True
+            "backup_enabled": True,
+            "profiling": False,
+            "page_size": 25,
+            "use_numpy": True,
+            "parallel_threshold": 500000,
+            "parallel_workers": None,
+            "report_cache_size": 256,
+            "block_codec": "zlib",
+            "replica_checkpoint_every": 1000,
+            "feed_max_bytes": 64 * 1024 * 1024,
+            "warmup": True
         }
         
-        if os.path.exists(self.config_file):
+        if os.path.exists(config_file):
             try:
-                with open(self.config_file, 'r') as f:
+                with open(config_file, 'r') as f:
                     config = json.load(f)
                     return {**default_config, **config}
             except:
@@ -66,9 +2183,12 @@ class ExpenseTracker:
     
     def _initialize_files(self):
         if not os.path.exists(self.filename):
-            with open(self.filename, 'w', newline='') as file:
-                writer = csv.writer(file)
-                writer.writerow(['ID', 'Date', 'Amount', 'Category', 'Note', 'Type'])
+            if self._store is not None:
+                self._store.rewrite([])
+            else:
+                with open(self.filename, 'w', newline='') as file:
+                    writer = csv.writer(file)
+                    writer.writerow(self.FIELDS)
             print(f"Created new expense file: {self.filename}")
         
         if not os.path.exists(self.budgets_file):
@@ -79,77 +2199,132 @@ class ExpenseTracker:
             with open(self.recurring_file, 'w') as f:
                 json.dump([], f)
     
-    def _load_expenses(self):
-        self.expenses = []
+    def _read_expenses(self):
+        """(rows, fields) of the expenses file as stored, without upgrading it"""
+        if self._store is not None:
+            return self._store.read(), self._store.fields
         with open(self.filename, 'r', newline='') as file:
             reader = csv.DictReader(file)
-            for row in reader:
-                self.expenses.append(row)
+            return list(reader), reader.fieldnames or self.FIELDS
+    
+    @instrumented('load')
+    def _load_expenses(self, touched=None):
+        with self._write_lock:
+            rows, fields = self._read_expenses()
+            if 'Currency' not in fields:
+                # Files from before multi-currency support hold base currency
+                # amounts; say so in the file, once, and use the rows as written
+                rows = [dict(row, Currency=row.get('Currency') or self.rates.base) for row in rows]
+                self._write_expenses_file(rows)
+            snapshot = self._publish(rows, touched)
+        if self.profiler.enabled:
+            self.profiler.count('reloads')
+            self.profiler.count('rows_scanned', len(snapshot.rows))
+            self.profiler.count('bytes_read', os.path.getsize(self.filename))
     
+    @instrumented('load_budgets')
     def _load_budgets(self):
         try:
             with open(self.budgets_file, 'r') as f:
-                self.budgets = json.load(f)
+                self.budgets = BudgetStore.from_json(json.load(f))
         except:
-            self.budgets = {}
+            self.budgets = BudgetStore()
+        if self.budgets.skipped:
+            print(f"{Colors.YELLOW}Skipped unreadable budgets in {self.budgets_file}: "
+                  f"{', '.join(repr(k) for k in self.budgets.skipped)}{Colors.RESET}")
+        self._persisted['budgets'] = json.dumps(self.budgets.to_json(), indent=2)
+    
+    def _write_state(self, name, filename, data):
+        """Write budgets or recurring entries to filename unless they are what it last held"""
+        text = json.dumps(data, indent=2)
+        if self._persisted.get(name) == text:
+            return
+        with open(filename, 'w') as f:
+            f.write(text)
+        self._persisted[name] = text
     
     def _save_budgets(self):
-        with open(self.budgets_file, 'w') as f:
-            json.dump(self.budgets, f, indent=2)
+        self._write_state('budgets', self.budgets_file, self.budgets.to_json())
+        self._emit('budgets', budgets=self.budgets.to_json())
     
+    @instrumented('load_recurring')
     def _load_recurring(self):
         try:
             with open(self.recurring_file, 'r') as f:
                 self.recurring_expenses = json.load(f)
         except:
             self.recurring_expenses = []
+        self._persisted['recurring'] = json.dumps(self.recurring_expenses, indent=2)
     
     def _save_recurring(self):
-        with open(self.recurring_file, 'w') as f:
-            json.dump(self.recurring_expenses, f, indent=2)
+        self._write_state('recurring', self.recurring_file, self.recurring_expenses)
+        self._emit('recurring', recurring=self.recurring_expenses)
     
+    @instrumented('next_id')
     def _get_next_id(self):
         if not self.expenses:
             return "1"
         max_id = max([int(e.get('ID', 0)) for e in self.expenses])
+        self.profiler.count('rows_scanned', len(self.expenses))
         return str(max_id + 1)
     
+    @instrumented('append')
+    def _append_entry(self, date, amount, category, note, entry_type, currency=None):
+        """Append one row to the expenses file, publish it and return its ID"""
+        with self._write_lock:
+            expense_id = self._get_next_id()
+            row = [expense_id, date, amount, category, note, entry_type, currency or self.rates.base]
+            if self._store is not None:
+                self.profiler.count('bytes_written', self._store.append([row]))
+            else:
+                with open(self.filename, 'a', newline='') as file:
+                    start = file.tell()
+                    writer = csv.writer(file)
+                    writer.writerow(row)
+                    self.profiler.count('bytes_written', file.tell() - start)
+            entry = dict(zip(self.FIELDS, row))
+            self._emit('add', row=entry)
+            # The new row is all that changed, so publish it without re-reading the file
+            self._publish_appended([entry], {date[:7]})
+        return expense_id
+    
+    @instrumented('process_recurring')
     def _process_recurring_expenses(self):
         today = datetime.now().date()
         added = 0
-        
-        for recurring in self.recurring_expenses:
-            last_added = datetime.strptime(recurring['last_added'], '%Y-%m-%d').date()
-            frequency = recurring['frequency']
-            should_add = False
-            if frequency == 'daily':
-                should_add = (today - last_added).days >= 1
-            elif frequency == 'weekly':
-                should_add = (today - last_added).days >= 7
-            elif frequency == 'monthly':
-                should_add = (today - last_added).days >= 28
-
-            if should_add:
-                expense_id = self._get_next_id()
-                with open(self.filename, 'a', newline='') as file:
-                    writer = csv.writer(file)
-                    writer.writerow([
-                        expense_id,
-                        today.strftime('%Y-%m-%d'),
-                        recurring['amount'],
-                        recurring['category'],
-                        recurring['note'],
-                        'expense'
-                    ])
-
-                recurring['last_added'] = today.strftime('%Y-%m-%d')
-                added += 1
+        events = []
+        
+        with self._write_lock:
+            for recurring in self.recurring_expenses:
+                last_added = datetime.strptime(recurring['last_added'], '%Y-%m-%d').date()
+                frequency = recurring['frequency']
+                should_add = False
+                if frequency == 'daily':
+                    should_add = (today - last_added).days >= 1
+                elif frequency == 'weekly':
+                    should_add = (today - last_added).days >= 7
+                elif frequency == 'monthly':
+                    should_add = (today - last_added).days >= 28
+
+                if should_add:
+                    date = today.strftime('%Y-%m-%d')
+                    event = self._add_entry(date, recurring['amount'], recurring['category'], recurring['note'],
+                                            'expense', recurring.get('currency'))
+                    if event:
+                        events.append(event)
+
+                    recurring['last_added'] = today.strftime('%Y-%m-%d')
+                    added += 1
+            
+            if added > 0:
+                self._save_recurring()
         
         if added > 0:
-            self._save_recurring()
-            self._load_expenses()
             print(f"{Colors.GREEN}✓ Added {added} recurring expense(s){Colors.RESET}")
+            for event in events:
+                self._print_budget_event(event)
     
+    @instrumented('add_expense')
     def add_expense(self, is_income=False):
         """Add a new expense or income entry"""
         entry_type = "Income" if is_income else "Expense"
@@ -157,7 +2332,7 @@ class ExpenseTracker:
         
         while True:
             try:
-                amount = float(input("Amount: $"))
+                amount = float(input(f"Amount: {self._symbol()}"))
                 if amount <= 0:
                     print("Amount must be positive. Try again.")
                     continue
@@ -165,6 +2340,13 @@ class ExpenseTracker:
             except ValueError:
                 print("Invalid amount. Please enter a number.")
         
+        while True:
+            currency = input(f"Currency (press Enter for {self.rates.base}): ").strip().upper() or self.rates.base
+            if self.rates.knows(currency):
+                break
+            print(f"No exchange rate for {currency}. Add it to {self.rates_file} or choose one of: "
+                  f"{', '.join(self.rates.currencies())}")
+        
         if not is_income:
             recent_categories = list(set([e['Category'] for e in self.expenses[-10:] if e.get('Type', 'expense') == 'expense']))
             if recent_categories:
@@ -197,6 +2379,7 @@ class ExpenseTracker:
                 
                 self.recurring_expenses.append({
                     'amount': f"{amount:.2f}",
+                    'currency': currency,
                     'category': category,
                     'note': note,
                     'frequency': frequency,
@@ -205,40 +2388,58 @@ class ExpenseTracker:
                 self._save_recurring()
                 print(f"{Colors.GREEN}✓ Set up as recurring {frequency} expense{Colors.RESET}")
         
-        expense_id = self._get_next_id()
         entry_type_code = 'income' if is_income else 'expense'
-        
-        with open(self.filename, 'a', newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow([expense_id, date, f"{amount:.2f}", category, note, entry_type_code])
+        event = self._add_entry(date, f"{amount:.2f}", category, note, entry_type_code, currency)
         
         color = Colors.GREEN if is_income else Colors.YELLOW
-        print(f"\n{color}✓ {entry_type} added: ${amount:.2f} for {category} on {date}{Colors.RESET}")
-        self._load_expenses()
+        print(f"\n{color}✓ {entry_type} added: {self._symbol(currency)}{amount:.2f} for {category} on {date}{Colors.RESET}")
         
-        if not is_income:
-            self._check_budget_alert(category, date)
+        if event:
+            self._print_budget_event(event)
     
-    def _check_budget_alert(self, category, date):
-
-        month_key = date[:7]
-        budget_key = f"{month_key}:{category}"
-        
-        if budget_key in self.budgets:
-            budget_amount = self.budgets[budget_key]
-            month_expenses = [e for e in self.expenses 
-                            if e['Date'].startswith(month_key) 
-                            and e['Category'] == category
-                            and e.get('Type', 'expense') == 'expense']
-            total_spent = sum(float(e['Amount']) for e in month_expenses)
-            
-            percentage = (total_spent / budget_amount) * 100
-            
-            if percentage >= 100:
-                print(f"{Colors.RED}WARNING: Over budget for {category}! (${total_spent:.2f}/${budget_amount:.2f}){Colors.RESET}")
-            elif percentage >= 80:
-                print(f"{Colors.YELLOW}Alert: {category} at {percentage:.0f}% of budget (${total_spent:.2f}/${budget_amount:.2f}){Colors.RESET}")
+    def _add_entry(self, date, amount, category, note, entry_type, currency=None):
+        """Write one entry as add_expense does and return the budget event it triggers, if any"""
+        with self._write_lock:
+            self._append_entry(date, amount, category, note, entry_type, currency)
+            if entry_type != 'expense':
+                return None
+            try:
+                return self._budget_monitor.record(date, category, self._to_base(float(amount), currency, date))
+            except Exception:
+                # The entry is already on disk and published; an alert is
+                # not worth failing the add over
+                return None
     
+    def _print_budget_event(self, event):
+        category, spent, budget = event['category'], event['spent'], event['budget']
+        sym = self._symbol()
+        if event['threshold'] >= 100:
+            print(f"{Colors.RED}WARNING: Over budget for {category}! ({sym}{spent:.2f}/{sym}{budget:.2f}){Colors.RESET}")
+        else:
+            print(f"{Colors.YELLOW}Alert: {category} at {event['percentage']:.0f}% of budget ({sym}{spent:.2f}/{sym}{budget:.2f}){Colors.RESET}")
+    
+    def _month_category_cents(self, month):
+        """Expense cents per category for month in the current ledger version"""
+        engine = self._analytics(self.snapshot())
+        lo, hi = engine.month_span(month)
+        return engine.period_totals(lo, hi, self._summarize(engine, lo, hi, top_k=0))['categories']
+    
+    @instrumented('budget_status')
+    def _budget_status(self, snapshot, month):
+        """Spend against every budget that applies to month, from one month rollup"""
+        spent = self._month_summary(snapshot, month)['categories']
+        status = []
+        for category, budget in sorted(self.budgets.for_month(month).items()):
+            amount = spent.get(category, 0.0)
+            status.append({
+                'category': category,
+                'budget': budget,
+                'spent': amount,
+                'percentage': (amount / budget) * 100 if budget > 0 else 0,
+            })
+        return status
+    
+    @instrumented('edit_expense')
     def edit_expense(self):
         """Edit an existing expense"""
         if not self.expenses:
@@ -249,7 +2450,7 @@ class ExpenseTracker:
         recent = sorted(self.expenses, key=lambda x: x['Date'], reverse=True)[:20]
         for exp in recent:
             exp_type = "📈" if exp.get('Type') == 'income' else "💰"
-            print(f"{exp_type} ID: {exp['ID']:<4} | {exp['Date']} | ${float(exp['Amount']):>8.2f} | {exp['Category']:<15} | {exp['Note'][:30]}")
+            print(f"{exp_type} ID: {exp['ID']:<4} | {exp['Date']} | {self._symbol(exp.get('Currency'))}{float(exp['Amount']):>8.2f} | {exp['Category']:<15} | {exp['Note'][:30]}")
         
         expense_id = input("\nEnter ID to edit (or 'cancel'): ").strip()
         if expense_id.lower() == 'cancel':
@@ -261,26 +2462,41 @@ class ExpenseTracker:
             print(f"{Colors.RED}Expense ID not found.{Colors.RESET}")
             return
         
-        print(f"\nEditing expense: {expense['Date']} | ${expense['Amount']} | {expense['Category']}")
+        print(f"\nEditing expense: {expense['Date']} | {self._symbol(expense.get('Currency'))}{expense['Amount']} | {expense['Category']}")
         print("Press Enter to keep current value")
         
-        new_amount = input(f"Amount (${expense['Amount']}): ").strip()
+        new_amount = input(f"Amount ({self._symbol(expense.get('Currency'))}{expense['Amount']}): ").strip()
+        new_currency = input(f"Currency ({expense.get('Currency') or self.rates.base}): ").strip().upper()
         new_category = input(f"Category ({expense['Category']}): ").strip()
         new_date = input(f"Date ({expense['Date']}): ").strip()
         new_note = input(f"Note ({expense['Note']}): ").strip()
         
+        # Published rows are shared with pinned snapshots, so edit a copy
+        updated = dict(expense)
         if new_amount:
-            expense['Amount'] = f"{float(new_amount):.2f}"
+            updated['Amount'] = f"{float(new_amount):.2f}"
+        if new_currency:
+            if not self.rates.knows(new_currency):
+                print(f"{Colors.RED}No exchange rate for {new_currency}. Keeping {updated.get('Currency') or self.rates.base}.{Colors.RESET}")
+            else:
+                updated['Currency'] = new_currency
         if new_category:
-            expense['Category'] = new_category
+            updated['Category'] = new_category
         if new_date:
-            expense['Date'] = new_date
+            try:
+                datetime.strptime(new_date, "%Y-%m-%d")
+                updated['Date'] = new_date
+            except ValueError:
+                print(f"{Colors.RED}Invalid date format. Keeping {updated['Date']}.{Colors.RESET}")
         if new_note:
-            expense['Note'] = new_note
+            updated['Note'] = new_note
 
-        self._rewrite_expenses_file()
+        if not self._replace_entry(expense_id, updated):
+            print(f"{Colors.RED}Expense ID not found.{Colors.RESET}")
+            return
         print(f"{Colors.GREEN}✓ Expense updated{Colors.RESET}")
 
+    @instrumented('delete_expense')
     def delete_expense(self):
         if not self.expenses:
             print("No expenses to delete.")
@@ -290,7 +2506,7 @@ class ExpenseTracker:
         recent = sorted(self.expenses, key=lambda x: x['Date'], reverse=True)[:20]
         for exp in recent:
             exp_type = "" if exp.get('Type') == 'income' else ""
-            print(f"{exp_type} ID: {exp['ID']:<4} | {exp['Date']} | ${float(exp['Amount']):>8.2f} | {exp['Category']:<15} | {exp['Note'][:30]}")
+            print(f"{exp_type} ID: {exp['ID']:<4} | {exp['Date']} | {self._symbol(exp.get('Currency'))}{float(exp['Amount']):>8.2f} | {exp['Category']:<15} | {exp['Note'][:30]}")
         
         expense_id = input("\nEnter ID to delete (or 'cancel'): ").strip()
         if expense_id.lower() == 'cancel':
@@ -301,34 +2517,147 @@ class ExpenseTracker:
             print(f"{Colors.RED}Expense ID not found.{Colors.RESET}")
             return
         
-        print(f"\nDelete: {expense['Date']} | ${expense['Amount']} | {expense['Category']} | {expense['Note']}")
+        print(f"\nDelete: {expense['Date']} | {self._symbol(expense.get('Currency'))}{expense['Amount']} | {expense['Category']} | {expense['Note']}")
         confirm = input(f"{Colors.YELLOW}Are you sure? (yes/no): {Colors.RESET}").strip().lower()
         
         if confirm == 'yes':
-            self.expenses.remove(expense)
-            self._rewrite_expenses_file()
+            if not self._replace_entry(expense_id, None):
+                print(f"{Colors.RED}Expense ID not found.{Colors.RESET}")
+                return
             print(f"{Colors.GREEN}✓ Expense deleted{Colors.RESET}")
         else:
             print("Deletion cancelled.")
     
-    def _rewrite_expenses_file(self):
-        """Rewrite the entire expenses file"""
-        with open(self.filename, 'w', newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow(['ID', 'Date', 'Amount', 'Category', 'Note', 'Type'])
-            for expense in self.expenses:
-                writer.writerow([
-                    expense['ID'],
-                    expense['Date'],
-                    expense['Amount'],
-                    expense['Category'],
-                    expense['Note'],
-                    expense.get('Type', 'expense')
-                ])
-        self._load_expenses()
+    def _replace_entry(self, expense_id, updated):
+        """Rewrite the ledger with entry expense_id replaced by updated (removed when None).
+
+        The rows come from the version current under the write lock, not
+        the one the user was shown, so a concurrent write is kept. Returns
+        False if the entry no longer exists.
+        """
+        with self._write_lock:
+            rows = self.expenses
+            index = next((i for i, e in enumerate(rows) if e['ID'] == expense_id), None)
+            if index is None:
+                return False
+            touched = {rows[index]['Date'][:7]}
+            if updated is None:
+                self._rewrite_expenses_file(rows[:index] + rows[index + 1:], touched)
+                self._emit('delete', id=expense_id)
+            else:
+                touched.add(updated['Date'][:7])
+                self._rewrite_expenses_file(rows[:index] + (updated,) + rows[index + 1:], touched)
+                self._emit('edit', row=updated)
+            return True
+    
+    @instrumented('rewrite')
+    def _rewrite_expenses_file(self, rows=None, touched=None):
+        """Rewrite the entire expenses file (from rows, or the current version).
+
+        touched lists the months whose entries differ from the current
+        version; None invalidates every cached report.
+        """
+        with self._write_lock:
+            self._write_expenses_file(self.expenses if rows is None else rows)
+            self._budget_monitor.reset()
+            self._load_expenses(touched)
+    
+    def _write_expenses_file(self, rows):
+        """Replace the expenses file with rows, in the current layout"""
+        records = ([
+            expense['ID'],
+            expense['Date'],
+            expense['Amount'],
+            expense['Category'],
+            expense['Note'],
+            expense.get('Type', 'expense'),
+            expense.get('Currency') or self.rates.base
+        ] for expense in rows)
+        if self._store is not None:
+            self.profiler.count('bytes_written', self._store.rewrite(records, self.FIELDS))
+        else:
+            with open(self.filename, 'w', newline='') as file:
+                writer = csv.writer(file)
+                writer.writerow(self.FIELDS)
+                writer.writerows(records)
+                self.profiler.count('bytes_written', file.tell())
+    
+    def _entry_filter(self, by, *criteria):
+        """Predicate for one search filter (category, date, amount, keyword or type)"""
+        if by == 'category':
+            category = criteria[0].lower()
+            return lambda e: e['Category'].lower() == category
+        if by == 'date':
+            start_date, end_date = criteria
+            return lambda e: start_date <= e['Date'] <= end_date
+        if by == 'amount':
+            min_amount, max_amount = criteria
+            return lambda e: min_amount <= self._base_amount(e) <= max_amount
+        if by == 'keyword':
+            keyword = criteria[0].lower()
+            return lambda e: keyword in e['Note'].lower()
+        if by == 'type':
+            entry_type = criteria[0]
+            return lambda e: e.get('Type', 'expense') == entry_type
+        raise ValueError(f"Unknown filter: {by}")
+    
+    @instrumented('search')
+    def _filter_entries(self, snapshot, by, *criteria):
+        """Rows of snapshot matching one search filter, in date order, and their totals.
+
+        Date ranges are a slice of the date index; other filters stream
+        over it lazily, so only the pages actually viewed get visited.
+        """
+        if by == 'date':
+            matches = snapshot.by_date(*criteria)
+            return matches, self._totals(matches)
+        predicate = self._entry_filter(by, *criteria)
+        self.profiler.count('rows_scanned', len(snapshot.rows))
+        totals = self._totals(filter(predicate, snapshot.rows))
+        return (e for e in snapshot.by_date() if predicate(e)), totals
+    
+    @instrumented('totals')
+    def _totals(self, rows):
+        """Entry count and expense/income totals over rows"""
+        count = 0
+        expenses = 0.0
+        income = 0.0
+        for e in rows:
+            count += 1
+            if e.get('Type', 'expense') == 'income':
+                income += self._base_amount(e)
+            else:
+                expenses += self._base_amount(e)
+        self.profiler.count('rows_scanned', count)
+        return {'count': count, 'expenses': expenses, 'income': income}
+    
+    def _ledger_totals(self, snapshot):
+        # Totals are in the base currency, so a change of base needs new ones
+        rates = self.rates
+        return snapshot.derive(('totals', rates), lambda: self._totals(snapshot.rows))
+    
+    def _page_size(self):
+        return int(self.config.get('page_size', 25))
+    
+    def _symbol(self, currency=None):
+        """Prefix for amounts in currency: the configured symbol for the base currency, else its code"""
+        if not currency or currency == self.rates.base:
+            return self.config['currency_symbol']
+        return f"{currency} "
+    
+    def _to_base(self, amount, currency, date):
+        """amount in the base currency (at face value when no rate is known)"""
+        if not currency or currency == self.rates.base:
+            return amount
+        rate = self.rates.rate(currency, date)
+        return amount if rate is None else amount * rate
+    
+    def _base_amount(self, row):
+        return self._to_base(float(row['Amount']), row.get('Currency'), row['Date'])
     
     def search_expenses(self):
         """Search and filter expenses"""
+        sym = self._symbol()
         print("\n--- Search & Filter ---")
         print("1. By category")
         print("2. By date range")
@@ -338,97 +2667,170 @@ class ExpenseTracker:
         
         choice = input("\nSelect search type (1-5): ").strip()
         
-        filtered = self.expenses[:]
+        snapshot = self.snapshot()
         
         if choice == '1':
             category = input("Enter category: ").strip()
-            filtered = [e for e in filtered if e['Category'].lower() == category.lower()]
+            criteria = ('category', category)
         
         elif choice == '2':
             start_date = input("Start date (YYYY-MM-DD): ").strip()
             end_date = input("End date (YYYY-MM-DD): ").strip()
-            filtered = [e for e in filtered if start_date <= e['Date'] <= end_date]
+            criteria = ('date', start_date, end_date)
         
         elif choice == '3':
-            min_amount = float(input("Minimum amount: $").strip())
-            max_amount = float(input("Maximum amount: $").strip())
-            filtered = [e for e in filtered if min_amount <= float(e['Amount']) <= max_amount]
+            min_amount = float(input(f"Minimum amount: {sym}").strip())
+            max_amount = float(input(f"Maximum amount: {sym}").strip())
+            criteria = ('amount', min_amount, max_amount)
         
         elif choice == '4':
-            keyword = input("Enter keyword: ").strip().lower()
-            filtered = [e for e in filtered if keyword in e['Note'].lower()]
+            keyword = input("Enter keyword: ").strip()
+            criteria = ('keyword', keyword)
         
         elif choice == '5':
             print("1. Expenses only")
             print("2. Income only")
             type_choice = input("Select (1-2): ").strip()
             search_type = 'expense' if type_choice == '1' else 'income'
-            filtered = [e for e in filtered if e.get('Type', 'expense') == search_type]
+            criteria = ('type', search_type)
         
         else:
             print("Invalid choice.")
             return
         
-        if not filtered:
+        matches, totals = self._filter_entries(snapshot, *criteria)
+        if not totals['count']:
             print(f"\n{Colors.YELLOW}No results found.{Colors.RESET}")
             return
         
-        print(f"\n--- Search Results ({len(filtered)} found) ---")
-        sorted_filtered = sorted(filtered, key=lambda x: x['Date'])
+        print(f"\n--- Search Results ({totals['count']} found) ---")
         
-        print(f"\n{'ID':<5} {'Date':<12} {'Amount':>10} {'Category':<20} {'Note':<30}")
-        print("-" * 80)
-        
-        total = 0
-        for expense in sorted_filtered:
+        def format_row(expense):
             amount = float(expense['Amount'])
-            total += amount if expense.get('Type', 'expense') == 'expense' else -amount
             note = expense['Note'][:27] + "..." if len(expense['Note']) > 30 else expense['Note']
             exp_type = "+" if expense.get('Type') == 'income' else "-"
-            print(f"{expense['ID']:<5} {expense['Date']:<12} {exp_type}${amount:>8.2f} {expense['Category']:<20} {note:<30}")
+            return f"{expense['ID']:<5} {expense['Date']:<12} {exp_type}{self._symbol(expense.get('Currency'))}{amount:>8.2f} {expense['Category']:<20} {note:<30}"
         
+        header = ["", f"{'ID':<5} {'Date':<12} {'Amount':>10} {'Category':<20} {'Note':<30}", "-" * 80]
+        Pager(matches, format_row, header, self._page_size(), total=totals['count']).run()
+        
+        total = totals['expenses'] - totals['income']
         print("-" * 80)
-        print(f"{'TOTAL':<5} {'':12} ${total:>9.2f}")
+        print(f"{'TOTAL':<5} {'':12} {sym}{total:>9.2f}")
     
+    @instrumented('view_all')
     def view_all_expenses(self):
+        sym = self._symbol()
         print("\n--- All Expenses ---")
         
-        if not self.expenses:
+        snapshot = self.snapshot()
+        if not snapshot.rows:
             print("No expenses recorded yet.")
             return
         
-        sorted_expenses = sorted(self.expenses, key=lambda x: x['Date'])
-        
-        print(f"\n{'ID':<5} {'Date':<12} {'Amount':>10} {'Category':<20} {'Note':<30}")
-        print("-" * 80)
-        
-        total_expenses = 0
-        total_income = 0
-        
-        for expense in sorted_expenses:
+        def format_row(expense):
             amount = float(expense['Amount'])
             is_income = expense.get('Type', 'expense') == 'income'
-            
-            if is_income:
-                total_income += amount
-            else:
-                total_expenses += amount
-            
             note = expense['Note'][:27] + "..." if len(expense['Note']) > 30 else expense['Note']
             sign = "+" if is_income else "-"
             color = Colors.GREEN if is_income else Colors.WHITE
-            print(f"{color}{expense['ID']:<5} {expense['Date']:<12} {sign}${amount:>8.2f} {expense['Category']:<20} {note:<30}{Colors.RESET}")
+            return f"{color}{expense['ID']:<5} {expense['Date']:<12} {sign}{self._symbol(expense.get('Currency'))}{amount:>8.2f} {expense['Category']:<20} {note:<30}{Colors.RESET}"
+        
+        header = ["", f"{'ID':<5} {'Date':<12} {'Amount':>10} {'Category':<20} {'Note':<30}", "-" * 80]
+        Pager(snapshot.by_date(), format_row, header, self._page_size()).run()
+        
+        totals = self._ledger_totals(snapshot)
+        total_expenses = totals['expenses']
+        total_income = totals['income']
         
         print("-" * 80)
-        print(f"{Colors.RED}Expenses: ${total_expenses:>9.2f}{Colors.RESET}")
-        print(f"{Colors.GREEN}Income:   ${total_income:>9.2f}{Colors.RESET}")
-        print(f"{Colors.CYAN}Net:      ${(total_income - total_expenses):>9.2f}{Colors.RESET}")
-        print(f"\nTotal entries: {len(sorted_expenses)}")
+        print(f"{Colors.RED}Expenses: {sym}{total_expenses:>9.2f}{Colors.RESET}")
+        print(f"{Colors.GREEN}Income:   {sym}{total_income:>9.2f}{Colors.RESET}")
+        print(f"{Colors.CYAN}Net:      {sym}{(total_income - total_expenses):>9.2f}{Colors.RESET}")
+        print(f"\nTotal entries: {totals['count']}")
+    
+    def _analytics(self, snapshot):
+        """Column store for snapshot, built on first use and shared by readers"""
+        use_numpy = self.config.get('use_numpy', True)
+        rates = self.rates
+        key = ('analytics', rates)
+        if self.profiler.enabled and key not in snapshot._derived:
+            self.profiler.count('rows_scanned', len(snapshot.rows))
+        return snapshot.derive(key, lambda: AnalyticsEngine(snapshot, use_numpy, rates))
+    
+    def _cached(self, report, snapshot, months, params, compute):
+        """compute() through the report cache, reused while months of snapshot are unchanged"""
+        key = (report, params, self.rates)
+        stamp = snapshot.generation(months)
+        found, value = self._report_cache.lookup(key, stamp)
+        if found:
+            self.profiler.count('cache_hits')
+            return value
+        value = compute()
+        self._report_cache.store(key, stamp, value)
+        return value
+    
+    def _warn_incomplete(self, snapshot):
+        """Say which entries the reports could not count exactly"""
+        engine = self._analytics(snapshot)
+        missing = engine.unconverted
+        if missing:
+            print(f"{Colors.YELLOW}No exchange rate for {', '.join(sorted(missing))} in {self.rates_file}; "
+                  f"those amounts are counted at face value.{Colors.RESET}")
+        if engine.invalid_dates:
+            dates = sorted(engine.invalid_dates)
+            shown = ', '.join(repr(d) for d in dates[:5]) + (', ...' if len(dates) > 5 else '')
+            print(f"{Colors.YELLOW}Entries dated {shown} are not valid YYYY-MM-DD dates and are left out "
+                  f"of reports; fix them with Edit.{Colors.RESET}")
+    
+    def _in_dollars(self, totals):
+        return {
+            'expenses': totals['expenses'] / 100,
+            'income': totals['income'] / 100,
+            'expense_count': totals['expense_count'],
+            'income_count': totals['income_count'],
+            'categories': {c: cents / 100 for c, cents in totals['categories'].items()},
+        }
+    
+    def _summarize(self, engine, lo, hi, top_k=5):
+        """Aggregate rows [lo, hi), across worker processes when the range is large"""
+        if self._aggregator is None:
+            self._aggregator = ParallelAggregator(self.config.get('parallel_workers'),
+                                                  self.config.get('parallel_threshold', 500_000))
+        self.profiler.count('rows_scanned', hi - lo)
+        return self._aggregator.summarize(engine, lo, hi, top_k, owner=self)
+    
+    @instrumented('monthly_summary')
+    def _month_summary(self, snapshot, month):
+        """Income, expense and per-category totals for one YYYY-MM month"""
+        return self._cached('month_summary', snapshot, (month,), month,
+                            lambda: self._range_summary(snapshot, month, month + '\uffff'))
+    
+    def _range_summary(self, snapshot, start, end):
+        engine = self._analytics(snapshot)
+        lo, hi = engine.span(start, end)
+        return self._in_dollars(engine.period_totals(lo, hi, self._summarize(engine, lo, hi, top_k=0)))
+    
+    def _range_totals(self, snapshot, start, end):
+        """_month_summary() for the dates start..end (inclusive)"""
+        try:
+            first = int(start[:4]) * 12 + int(start[5:7]) - 1
+            last = int(end[:4]) * 12 + int(end[5:7]) - 1
+        except ValueError:
+            first, last = 0, -1
+        # Long or malformed ranges are stamped like whole-ledger reports
+        months = None
+        if 0 <= last - first < 240:
+            months = tuple(f"{m // 12:04d}-{m % 12 + 1:02d}" for m in range(first, last + 1))
+        return self._cached('range_summary', snapshot, months, (start, end),
+                            lambda: self._range_summary(snapshot, start, end))
     
     def monthly_summary(self):
+        sym = self._symbol()
         print("\n--- Monthly Summary ---")
         
-        if not self.expenses:
+        snapshot = self.snapshot()
+        if not snapshot.rows:
             print("No expenses recorded yet.")
             return
         
@@ -443,29 +2845,26 @@ class ExpenseTracker:
             print("Invalid format. Please use YYYY-MM (e.g., 2026-04)")
             return
         
-        month_expenses = [e for e in self.expenses if e['Date'].startswith(month_input) and e.get('Type', 'expense') == 'expense']
-        month_income = [e for e in self.expenses if e['Date'].startswith(month_input) and e.get('Type') == 'income']
+        summary = self._month_summary(snapshot, month_input)
+        self._warn_incomplete(snapshot)
         
-        if not month_expenses and not month_income:
+        if not summary['expense_count'] and not summary['income_count']:
             print(f"\nNo entries found for {month_input}")
             return
         
-        total_expenses = sum(float(e['Amount']) for e in month_expenses)
-        total_income = sum(float(e['Amount']) for e in month_income)
-        category_totals = defaultdict(float)
-        
-        for expense in month_expenses:
-            category_totals[expense['Category']] += float(expense['Amount'])
+        total_expenses = summary['expenses']
+        total_income = summary['income']
+        category_totals = summary['categories']
         
         month_name = datetime.strptime(month_input + "-01", "%Y-%m-%d").strftime("%B %Y")
         print(f"\n{'='*50}")
         print(f"  {month_name}")
         print(f"{'='*50}")
-        print(f"{Colors.GREEN}Income:   ${total_income:>10.2f}{Colors.RESET}")
-        print(f"{Colors.RED}Expenses: ${total_expenses:>10.2f}{Colors.RESET}")
-        print(f"{Colors.CYAN}Net:      ${(total_income - total_expenses):>10.2f}{Colors.RESET}")
+        print(f"{Colors.GREEN}Income:   {sym}{total_income:>10.2f}{Colors.RESET}")
+        print(f"{Colors.RED}Expenses: {sym}{total_expenses:>10.2f}{Colors.RESET}")
+        print(f"{Colors.CYAN}Net:      {sym}{(total_income - total_expenses):>10.2f}{Colors.RESET}")
         
-        if month_expenses:
+        if summary['expense_count']:
             print(f"\n{Colors.BOLD}Spending by Category:{Colors.RESET}")
             print("-" * 50)
             
@@ -474,12 +2873,11 @@ class ExpenseTracker:
             for category, amount in sorted_categories:
                 percentage = (amount / total_expenses) * 100
                 
-                budget_key = f"{month_input}:{category}"
+                budget = self.budgets.get(month_input, category)
                 budget_status = ""
                 bar_color = Colors.WHITE
                 
-                if budget_key in self.budgets:
-                    budget = self.budgets[budget_key]
+                if budget:
                     budget_pct = (amount / budget) * 100
                     if budget_pct > 100:
                         bar_color = Colors.RED
@@ -488,96 +2886,92 @@ class ExpenseTracker:
                         bar_color = Colors.YELLOW
                     else:
                         bar_color = Colors.GREEN
-                    budget_status = f" (${amount:.2f}/${budget:.2f})" + budget_status
+                    budget_status = f" ({sym}{amount:.2f}/{sym}{budget:.2f})" + budget_status
                 
                 bar_length = int(percentage / 5)
                 bar = bar_color + "█" * bar_length + "░" * (20 - bar_length) + Colors.RESET
                 
-                print(f"{category:<20} {bar} ${amount:>8.2f} ({percentage:>5.1f}%){budget_status}")
+                print(f"{category:<20} {bar} {sym}{amount:>8.2f} ({percentage:>5.1f}%){budget_status}")
             
             print("=" * 50)
             
             days_in_month = (datetime.now().replace(day=1) + timedelta(days=32)).replace(day=1) - timedelta(days=1)
             avg_daily = total_expenses / days_in_month.day
-            print(f"Daily average: ${avg_daily:.2f}")
+            print(f"Daily average: {sym}{avg_daily:.2f}")
+    
+    @instrumented('statistics_dashboard')
+    def _dashboard_stats(self, snapshot):
+        """Whole-ledger statistics, or None when there are no expenses"""
+        def compute():
+            engine = self._analytics(snapshot)
+            # Sorting every expense for the percentiles is independent of the rollup
+            percentiles = self.submit_report(lambda _: engine.percentiles((50, 90, 99)), snapshot=snapshot)
+            return engine.dashboard(self._summarize(engine, 0, len(engine)), percentiles.result())
+        return self._cached('dashboard', snapshot, None, None, compute)
     
     def statistics_dashboard(self):
+        sym = self._symbol()
         print("\n" + "="*60)
         print(f"{Colors.BOLD}{'STATISTICS DASHBOARD':^60}{Colors.RESET}")
         print("="*60)
         
-        if not self.expenses:
+        snapshot = self.snapshot()
+        if not snapshot.rows:
             print("No data available yet.")
             return
         
-        expenses_only = [e for e in self.expenses if e.get('Type', 'expense') == 'expense']
-        income_only = [e for e in self.expenses if e.get('Type') == 'income']
-        
-        if not expenses_only:
+        stats = self._dashboard_stats(snapshot)
+        if stats is None:
             print("No expense data available yet.")
             return
-        
-        total_expense = sum(float(e['Amount']) for e in expenses_only)
-        total_income = sum(float(e['Amount']) for e in income_only)
-        avg_expense = total_expense / len(expenses_only)
-        
-        highest = max(expenses_only, key=lambda x: float(x['Amount']))
-        
-        category_counts = defaultdict(int)
-        category_totals = defaultdict(float)
-        for exp in expenses_only:
-            category_counts[exp['Category']] += 1
-            category_totals[exp['Category']] += float(exp['Amount'])
-        
-        most_frequent_cat = max(category_counts.items(), key=lambda x: x[1])
-        most_expensive_cat = max(category_totals.items(), key=lambda x: x[1])
-        
-        dates = sorted([datetime.strptime(e['Date'], '%Y-%m-%d') for e in expenses_only])
-        first_date = dates[0]
-        last_date = dates[-1]
-        days_tracked = (last_date - first_date).days + 1
-        
+        self._warn_incomplete(snapshot)
+        
+        total_expense = stats['total_expense']
+        total_income = stats['total_income']
+        days_tracked = stats['days_tracked']
+        highest = stats['highest']
+        most_frequent_cat = stats['most_frequent_cat']
+        most_expensive_cat = stats['most_expensive_cat']
 
         print(f"\n{Colors.CYAN}Overall Statistics:{Colors.RESET}")
-        print(f"  Total Expenses:        ${total_expense:,.2f}")
-        print(f"  Total Income:          ${total_income:,.2f}")
-        print(f"  Net:                   ${(total_income - total_expense):,.2f}")
-        print(f"  Number of Expenses:    {len(expenses_only)}")
-        print(f"  Average Expense:       ${avg_expense:.2f}")
+        print(f"  Total Expenses:        {sym}{total_expense:,.2f}")
+        print(f"  Total Income:          {sym}{total_income:,.2f}")
+        print(f"  Net:                   {sym}{(total_income - total_expense):,.2f}")
+        print(f"  Number of Expenses:    {stats['expense_count']}")
+        print(f"  Average Expense:       {sym}{stats['avg_expense']:.2f}")
         print(f"  Days Tracked:          {days_tracked}")
-        print(f"  Average Daily Spend:   ${total_expense/days_tracked:.2f}")
+        print(f"  Average Daily Spend:   {sym}{total_expense/days_tracked:.2f}")
         
         print(f"\n{Colors.YELLOW}Highest Expense:{Colors.RESET}")
-        print(f"  ${highest['Amount']} - {highest['Category']} on {highest['Date']}")
+        print(f"  {self._symbol(highest.get('Currency'))}{highest['Amount']} - {highest['Category']} on {highest['Date']}")
         print(f"  Note: {highest['Note']}")
         
         print(f"\n{Colors.MAGENTA}Category Analysis:{Colors.RESET}")
         print(f"  Most Frequent:         {most_frequent_cat[0]} ({most_frequent_cat[1]} times)")
-        print(f"  Most Expensive:        {most_expensive_cat[0]} (${most_expensive_cat[1]:.2f})")
-        print(f"  Total Categories:      {len(category_counts)}")
+        print(f"  Most Expensive:        {most_expensive_cat[0]} ({sym}{most_expensive_cat[1]:.2f})")
+        print(f"  Total Categories:      {stats['category_count']}")
 
-        if len(expenses_only) >= 10:
-            recent_10 = expenses_only[-10:]
-            older_10 = expenses_only[-20:-10] if len(expenses_only) >= 20 else expenses_only[:-10]
-            
-            recent_avg = sum(float(e['Amount']) for e in recent_10) / len(recent_10)
-            older_avg = sum(float(e['Amount']) for e in older_10) / len(older_10)
+        p50, p90, p99 = stats['percentiles']
+        print(f"  Median / P90 / P99:    {sym}{p50:.2f} / {sym}{p90:.2f} / {sym}{p99:.2f}")
+
+        if stats['trend']:
+            recent_avg, older_avg, window = stats['trend']
             
             trend = "↑ Increasing" if recent_avg > older_avg else "↓ Decreasing"
             trend_color = Colors.RED if recent_avg > older_avg else Colors.GREEN
             
             print(f"\n{Colors.CYAN}Spending Trend:{Colors.RESET}")
-            print(f"  {trend_color}{trend}{Colors.RESET} (Recent avg: ${recent_avg:.2f} vs ${older_avg:.2f})")
+            print(f"  {trend_color}{trend}{Colors.RESET} (Last {window} days: {sym}{recent_avg:.2f}/day vs {sym}{older_avg:.2f}/day before)")
         
         print(f"\n{Colors.BOLD}Top 5 Expenses:{Colors.RESET}")
-        top_5 = sorted(expenses_only, key=lambda x: float(x['Amount']), reverse=True)[:5]
-        for i, exp in enumerate(top_5, 1):
-            print(f"  {i}. ${exp['Amount']:<8} - {exp['Category']:<15} ({exp['Date']})")
+        for i, exp in enumerate(stats['top_5'], 1):
+            print(f"  {i}. {self._symbol(exp.get('Currency'))}{exp['Amount']:<8} - {exp['Category']:<15} ({exp['Date']})")
         
         print("="*60)
     
     def manage_budgets(self):
         """Manage category budgets"""
+        sym = self._symbol()
         print("\n--- Budget Management ---")
         print("1. Set/Update budget")
         print("2. View all budgets")
@@ -592,12 +2986,16 @@ class ExpenseTracker:
                 month = datetime.now().strftime("%Y-%m")
             
             category = input("Category: ").strip()
-            amount = float(input("Budget amount: $").strip())
+            amount = float(input(f"Budget amount: {sym}").strip())
+            every_month = input("Use this budget for every month? (y/n): ").strip().lower() == 'y'
             
-            budget_key = f"{month}:{category}"
-            self.budgets[budget_key] = amount
+            if every_month:
+                self.budgets.set_template(category, amount)
+                month = "every month"
+            else:
+                self.budgets.set(month, category, amount)
             self._save_budgets()
-            print(f"{Colors.GREEN}✓ Budget set: {category} = ${amount:.2f} for {month}{Colors.RESET}")
+            print(f"{Colors.GREEN}✓ Budget set: {category} = {sym}{amount:.2f} for {month}{Colors.RESET}")
         
         elif choice == '2':
             if not self.budgets:
@@ -606,49 +3004,43 @@ class ExpenseTracker:
             
             print(f"\n{'Month':<10} {'Category':<20} {'Budget':>10}")
             print("-" * 45)
-            for key, amount in sorted(self.budgets.items()):
-                month, category = key.split(':')
-                print(f"{month:<10} {category:<20} ${amount:>9.2f}")
+            for month, category, amount in self.budgets.entries():
+                print(f"{month or 'Every':<10} {category:<20} {sym}{amount:>9.2f}")
         
         elif choice == '3':
             if not self.budgets:
                 print("No budgets to delete.")
                 return
             
+            entries = self.budgets.entries()
             print("\nExisting budgets:")
-            for i, key in enumerate(sorted(self.budgets.keys()), 1):
-                month, category = key.split(':')
-                print(f"{i}. {month} - {category}: ${self.budgets[key]:.2f}")
+            for i, (month, category, amount) in enumerate(entries, 1):
+                print(f"{i}. {month or 'Every month'} - {category}: {sym}{amount:.2f}")
             
             idx = int(input("\nEnter number to delete: ").strip()) - 1
-            keys = sorted(self.budgets.keys())
-            if 0 <= idx < len(keys):
-                del self.budgets[keys[idx]]
+            if 0 <= idx < len(entries):
+                month, category, _ = entries[idx]
+                self.budgets.delete(month, category)
                 self._save_budgets()
                 print(f"{Colors.GREEN}✓ Budget deleted{Colors.RESET}")
         
         elif choice == '4':
             current_month = datetime.now().strftime("%Y-%m")
-            month_budgets = {k: v for k, v in self.budgets.items() if k.startswith(current_month)}
+            status = self._budget_status(self.snapshot(), current_month)
             
-            if not month_budgets:
+            if not status:
                 print("No budgets set for current month.")
                 return
             
             print(f"\n{Colors.BOLD}Budget Status - {datetime.now().strftime('%B %Y')}{Colors.RESET}")
             print("-" * 60)
             
-            for key, budget in sorted(month_budgets.items()):
-                _, category = key.split(':')
-                
-                month_expenses = [e for e in self.expenses 
-                                if e['Date'].startswith(current_month) 
-                                and e['Category'] == category
-                                and e.get('Type', 'expense') == 'expense']
-                spent = sum(float(e['Amount']) for e in month_expenses)
-                
+            for entry in status:
+                category = entry['category']
+                budget = entry['budget']
+                spent = entry['spent']
                 remaining = budget - spent
-                percentage = (spent / budget) * 100 if budget > 0 else 0
+                percentage = entry['percentage']
                 
                 if percentage > 100:
                     color = Colors.RED
@@ -665,8 +3057,8 @@ class ExpenseTracker:
                 bar = "█" * bar_length + "░" * (20 - bar_length)
                 
                 print(f"{category:<20} {color}{bar}{Colors.RESET}")
-                print(f"  ${spent:.2f} / ${budget:.2f} ({percentage:.1f}%) - {color}{status}{Colors.RESET}")
-                print(f"  Remaining: ${remaining:.2f}\n")
+                print(f"  {sym}{spent:.2f} / {sym}{budget:.2f} ({percentage:.1f}%) - {color}{status}{Colors.RESET}")
+                print(f"  Remaining: {sym}{remaining:.2f}\n")
     
     def manage_recurring(self):
         print("\n--- Recurring Expenses ---")
@@ -680,7 +3072,7 @@ class ExpenseTracker:
         print("-" * 60)
         
         for i, rec in enumerate(self.recurring_expenses, 1):
-            print(f"{i:<3} ${float(rec['amount']):>9.2f} {rec['category']:<20} {rec['frequency']:<10} {rec['last_added']:<12}")
+            print(f"{i:<3} {self._symbol(rec.get('currency'))}{float(rec['amount']):>9.2f} {rec['category']:<20} {rec['frequency']:<10} {rec['last_added']:<12}")
         
         print("\n1. Delete recurring expense")
         print("2. Back to main menu")
@@ -699,8 +3091,9 @@ class ExpenseTracker:
         print("1. Month vs Previous Month")
         print("2. Month vs Same Month Last Year")
         print("3. Custom Date Range Comparison")
+        print("4. Monthly Spending Trend")
         
-        choice = input("\nSelect option (1-3): ").strip()
+        choice = input("\nSelect option (1-4): ").strip()
         
         if choice == '1':
             current_month = datetime.now().strftime("%Y-%m")
@@ -725,22 +3118,56 @@ class ExpenseTracker:
             period2_end = input("Period 2 end (YYYY-MM-DD): ").strip()
             
             self._compare_date_ranges(period1_start, period1_end, period2_start, period2_end)
+        
+        elif choice == '4':
+            months = input("Number of months (Enter for 12): ").strip()
+            self._spending_trend(int(months) if months else 12)
+    
+    @instrumented('spending_trend')
+    def _spending_trend(self, months=12):
+        """Monthly expense totals with a 3-month rolling mean and EWMA"""
+        sym = self._symbol()
+        snapshot = self.snapshot()
+        keys, totals, rolling, smoothed = self._monthly_trend(snapshot)
+        if not keys:
+            print("No expense data available yet.")
+            return
+        self._warn_incomplete(snapshot)
+        
+        print(f"\n{'Month':<10} {'Spent':>12} {'3-mo avg':>12} {'EWMA':>12}")
+        print("-" * 50)
+        for key, total, mean, ewma in list(zip(keys, totals, rolling, smoothed))[-months:]:
+            month = f"{key // 12:04d}-{key % 12 + 1:02d}"
+            mean_text = f"{sym}{mean / 100:>11.2f}" if mean is not None else f"{'-':>12}"
+            print(f"{month:<10} {sym}{total / 100:>11.2f} {mean_text} {sym}{ewma / 100:>11.2f}")
     
+    def _monthly_trend(self, snapshot):
+        """Month keys with expense totals, 3-month rolling means and EWMA (cents)"""
+        def compute():
+            engine = self._analytics(snapshot)
+            keys, totals = engine.series('monthly')
+            rolling = engine.rolling_mean(totals, 3)
+            rolling = [None] * (len(totals) - len(rolling)) + rolling
+            return keys, totals, rolling, engine.ewma(totals)
+        return self._cached('monthly_trend', snapshot, None, None, compute)
+    
+    @instrumented('compare_periods')
     def _compare_periods(self, period1, period2, label1, label2):
         """Compare two monthly periods"""
-        expenses1 = [e for e in self.expenses if e['Date'].startswith(period1) and e.get('Type', 'expense') == 'expense']
-        expenses2 = [e for e in self.expenses if e['Date'].startswith(period2) and e.get('Type', 'expense') == 'expense']
-        
-        total1 = sum(float(e['Amount']) for e in expenses1)
-        total2 = sum(float(e['Amount']) for e in expenses2)
-        
-        cat1 = defaultdict(float)
-        cat2 = defaultdict(float)
-        
-        for e in expenses1:
-            cat1[e['Category']] += float(e['Amount'])
-        for e in expenses2:
-            cat2[e['Category']] += float(e['Amount'])
+        sym = self._symbol()
+        snapshot = self.snapshot()
+        # Build the column store once, here, rather than in both threads
+        self._analytics(snapshot)
+        # The periods are independent: roll one up on the report pool meanwhile
+        pending = self.submit_report(self._month_summary, period1, snapshot=snapshot)
+        summary2 = self._month_summary(snapshot, period2)
+        summary1 = pending.result()
+        self._warn_incomplete(snapshot)
+        
+        total1 = summary1['expenses']
+        total2 = summary2['expenses']
+        cat1 = summary1['categories']
+        cat2 = summary2['categories']
         
         all_categories = set(cat1.keys()) | set(cat2.keys())
         
@@ -759,7 +3186,7 @@ class ExpenseTracker:
             change_color = Colors.RED if change > 0 else Colors.GREEN if change < 0 else Colors.WHITE
             sign = "+" if change > 0 else ""
             
-            print(f"{category:<20} ${amt1:>11.2f} ${amt2:>11.2f} {change_color}{sign}${change:>10.2f} {sign}{pct_change:>6.1f}%{Colors.RESET}")
+            print(f"{category:<20} {sym}{amt1:>11.2f} {sym}{amt2:>11.2f} {change_color}{sign}{sym}{change:>10.2f} {sign}{pct_change:>6.1f}%{Colors.RESET}")
         
         print("-" * 70)
         total_change = total1 - total2
@@ -767,20 +3194,26 @@ class ExpenseTracker:
         change_color = Colors.RED if total_change > 0 else Colors.GREEN if total_change < 0 else Colors.WHITE
         sign = "+" if total_change > 0 else ""
         
-        print(f"{'TOTAL':<20} ${total1:>11.2f} ${total2:>11.2f} {change_color}{sign}${total_change:>10.2f} {sign}{total_pct:>6.1f}%{Colors.RESET}")
+        print(f"{'TOTAL':<20} {sym}{total1:>11.2f} {sym}{total2:>11.2f} {change_color}{sign}{sym}{total_change:>10.2f} {sign}{total_pct:>6.1f}%{Colors.RESET}")
         print("="*70)
     
+    @instrumented('compare_date_ranges')
     def _compare_date_ranges(self, start1, end1, start2, end2):
         """Compare two custom date ranges"""
-        expenses1 = [e for e in self.expenses if start1 <= e['Date'] <= end1 and e.get('Type', 'expense') == 'expense']
-        expenses2 = [e for e in self.expenses if start2 <= e['Date'] <= end2 and e.get('Type', 'expense') == 'expense']
-        
-        total1 = sum(float(e['Amount']) for e in expenses1)
-        total2 = sum(float(e['Amount']) for e in expenses2)
-        print(f"\nPeriod 1 ({start1} to {end1}): ${total1:.2f} ({len(expenses1)} expenses)")
-        print(f"Period 2 ({start2} to {end2}): ${total2:.2f} ({len(expenses2)} expenses)")
-        
-        print(f"Difference: ${total1 - total2:.2f}")
+        sym = self._symbol()
+        snapshot = self.snapshot()
+        self._analytics(snapshot)
+        pending = self.submit_report(self._range_totals, start1, end1, snapshot=snapshot)
+        period2 = self._range_totals(snapshot, start2, end2)
+        period1 = pending.result()
+        self._warn_incomplete(snapshot)
+        total1 = period1['expenses']
+        total2 = period2['expenses']
+        print(f"\nPeriod 1 ({start1} to {end1}): {sym}{total1:.2f} ({period1['expense_count']} expenses)")
+        print(f"Period 2 ({start2} to {end2}): {sym}{total2:.2f} ({period2['expense_count']} expenses)")
+        
+        print(f"Difference: {sym}{total1 - total2:.2f}")
+    @instrumented('backup')
     def backup_data(self):
         """Create a backup of all data files"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -789,16 +3222,59 @@ class ExpenseTracker:
         try:
             os.makedirs(backup_dir, exist_ok=True)
             
-            shutil.copy(self.filename, os.path.join(backup_dir, self.filename))
+            shutil.copy(self.filename, os.path.join(backup_dir, os.path.basename(self.filename)))
             if os.path.exists(self.budgets_file):
-                shutil.copy(self.budgets_file, os.path.join(backup_dir, self.budgets_file))
+                shutil.copy(self.budgets_file, os.path.join(backup_dir, os.path.basename(self.budgets_file)))
             if os.path.exists(self.recurring_file):
-                shutil.copy(self.recurring_file, os.path.join(backup_dir, self.recurring_file))
+                shutil.copy(self.recurring_file, os.path.join(backup_dir, os.path.basename(self.recurring_file)))
+            if os.path.exists(self.rates_file):
+                shutil.copy(self.rates_file, os.path.join(backup_dir, os.path.basename(self.rates_file)))
             
+            if self.profiler.enabled:
+                copied = sum(os.path.getsize(os.path.join(backup_dir, name)) for name in os.listdir(backup_dir))
+                self.profiler.count('bytes_read', copied)
+                self.profiler.count('bytes_written', copied)
             print(f"{Colors.GREEN}✓ Backup created: {backup_dir}/{Colors.RESET}")
         except Exception as e:
             print(f"{Colors.RED}Backup failed: {e}{Colors.RESET}")
     
+    @instrumented('export_csv')
+    def _export_csv(self, snapshot, start_date, end_date, filename):
+        filtered = [e for e in snapshot.rows if start_date <= e['Date'] <= end_date]
+        with open(filename, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=self.FIELDS)
+            writer.writeheader()
+            writer.writerows(filtered)
+            self.profiler.count('bytes_written', f.tell())
+        self.profiler.count('rows_scanned', len(snapshot.rows))
+        return filename
+    
+    @instrumented('export_json')
+    def _export_json(self, snapshot, filename):
+        with open(filename, 'w') as f:
+            json.dump(list(snapshot.rows), f, indent=2)
+            self.profiler.count('bytes_written', f.tell())
+        self.profiler.count('rows_scanned', len(snapshot.rows))
+        return filename
+    
+    @instrumented('export_text')
+    def _export_text_report(self, snapshot, month, filename):
+        month_expenses = [e for e in snapshot.rows if e['Date'].startswith(month)]
+        month_name = datetime.strptime(month + "-01", "%Y-%m-%d").strftime("%B %Y")
+        with open(filename, 'w') as f:
+            f.write(f"Expense Report - {month_name}\n")
+            f.write("="*60 + "\n\n")
+            
+            for exp in sorted(month_expenses, key=lambda x: x['Date']):
+                f.write(f"{exp['Date']} | {self._symbol(exp.get('Currency'))}{exp['Amount']:>8} | {exp['Category']:<20} | {exp['Note']}\n")
+            
+            total = sum(self._base_amount(e) for e in month_expenses if e.get('Type', 'expense') == 'expense')
+            f.write("\n" + "-"*60 + "\n")
+            f.write(f"Total: {self._symbol()}{total:.2f}\n")
+            self.profiler.count('bytes_written', f.tell())
+        self.profiler.count('rows_scanned', len(snapshot.rows))
+        return filename
+    
     def export_data(self):
         print("\n--- Export Data ---")
         print("1. Export to CSV (custom range)")
@@ -811,39 +3287,23 @@ class ExpenseTracker:
             start_date = input("Start date (YYYY-MM-DD): ").strip()
             end_date = input("End date (YYYY-MM-DD): ").strip()
             
-            filtered = [e for e in self.expenses if start_date <= e['Date'] <= end_date]
-            
             filename = f"export_{start_date}_to_{end_date}.csv"
-            with open(filename, 'w', newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=['ID', 'Date', 'Amount', 'Category', 'Note', 'Type'])
-                writer.writeheader()
-                writer.writerows(filtered)
-            
-            print(f"{Colors.GREEN}✓ Exported to {filename}{Colors.RESET}")
+            future = self.submit_report(self._export_csv, start_date, end_date, filename)
         
         elif choice == '2':
             filename = f"expenses_export_{datetime.now().strftime('%Y%m%d')}.json"
-            with open(filename, 'w') as f:
-                json.dump(self.expenses, f, indent=2)
-            print(f"{Colors.GREEN}✓ Exported to {filename}{Colors.RESET}")
+            future = self.submit_report(self._export_json, filename)
         
         elif choice == '3':
             current_month = datetime.now().strftime("%Y-%m")
-            month_expenses = [e for e in self.expenses if e['Date'].startswith(current_month)]
-            
             filename = f"report_{current_month}.txt"
-            with open(filename, 'w') as f:
-                f.write(f"Expense Report - {datetime.now().strftime('%B %Y')}\n")
-                f.write("="*60 + "\n\n")
-                
-                for exp in sorted(month_expenses, key=lambda x: x['Date']):
-                    f.write(f"{exp['Date']} | ${exp['Amount']:>8} | {exp['Category']:<20} | {exp['Note']}\n")
-                
-                total = sum(float(e['Amount']) for e in month_expenses if e.get('Type', 'expense') == 'expense')
-                f.write("\n" + "-"*60 + "\n")
-                f.write(f"Total: ${total:.2f}\n")
-            
-            print(f"{Colors.GREEN}✓ Report saved to {filename}{Colors.RESET}")
+            future = self.submit_report(self._export_text_report, current_month, filename)
+        
+        else:
+            return
+        # Exports read a pinned version, so the menu (and writes) carry on meanwhile
+        self._exports.append((filename, future))
+        print(f"Exporting to {filename} in the background...")
     
     def display_menu(self):
         print("\n" + "="*50)
@@ -874,10 +3334,11 @@ class ExpenseTracker:
         """Manage application settings"""
         print("\n--- Settings ---")
         print(f"1. Toggle colors (currently: {'ON' if self.config['use_colors'] else 'OFF'})")
-        print(f"2. Currency symbol (currently: {self.config['currency_symbol']})")
-        print("3. Back to main menu")
+        print(f"2. Currency (symbol {self.config['currency_symbol']}, base {self.rates.base})")
+        print("3. Performance")
+        print("4. Back to main menu")
         
-        choice = input("\nSelect option (1-3): ").strip()
+        choice = input("\nSelect option (1-4): ").strip()
         
         if choice == '1':
             self.config['use_colors'] = not self.config['use_colors']
@@ -887,10 +3348,80 @@ class ExpenseTracker:
             print(f"{Colors.GREEN}✓ Colors {'enabled' if self.config['use_colors'] else 'disabled'}{Colors.RESET}")
         
         elif choice == '2':
-            symbol = input("Enter new currency symbol: ").strip()
-            self.config['currency_symbol'] = symbol
+            symbol = input("Enter new currency symbol (press Enter to keep): ").strip()
+            if symbol:
+                self.config['currency_symbol'] = symbol
+            base = input(f"Base currency for reports (press Enter to keep {self.rates.base}): ").strip().upper()
+            if base and base != self.rates.base:
+                if self.rates.knows(base):
+                    self.config['base_currency'] = base
+                    self.rates = RateTable.load(self.rates_file, base)
+                    self._budget_monitor.reset()
+                else:
+                    print(f"{Colors.RED}No exchange rate for {base} in {self.rates_file}{Colors.RESET}")
             self._save_config()
-            print(f"{Colors.GREEN}✓ Currency symbol updated to {symbol}{Colors.RESET}")
+            print(f"{Colors.GREEN}✓ Currency: symbol {self.config['currency_symbol']}, base {self.rates.base}{Colors.RESET}")
+        
+        elif choice == '3':
+            self.performance_menu()
+    
+    def performance_menu(self):
+        """Show recorded operation timings and profiling tools"""
+        profiler = self.profiler
+        print(f"\n--- Performance (profiling {'ON' if profiler.enabled else 'OFF'}) ---")
+        
+        if profiler.stats:
+            print(f"\n{'Operation':<22} {'Calls':>6} {'Total s':>9} {'Avg ms':>9} {'Rows':>10} "
+                  f"{'Read':>10} {'Written':>10} {'Hits':>6} {'Reloads':>8}")
+            print("-" * 98)
+            for name, entry in sorted(profiler.stats.items(), key=lambda x: x[1]['seconds'], reverse=True):
+                avg_ms = entry['seconds'] / entry['calls'] * 1000
+                print(f"{name:<22} {entry['calls']:>6} {entry['seconds']:>9.3f} {avg_ms:>9.2f} "
+                      f"{entry['rows_scanned']:>10} {entry['bytes_read']:>10} {entry['bytes_written']:>10} "
+                      f"{entry['cache_hits']:>6} {entry['reloads']:>8}")
+        elif profiler.enabled:
+            print("No operations recorded yet.")
+        cache = self._report_cache.stats()
+        hit_rate = f"{cache['hit_rate'] * 100:.0f}%" if cache['hit_rate'] is not None else "-"
+        print(f"\nReport cache: {cache['entries']}/{cache['max_entries']} entries, "
+              f"{cache['hits']} hits, {cache['misses']} misses (hit rate {hit_rate})")
+        if self._warmup is not None:
+            print(f"Warm-up: {self._warmup.completed} views precomputed, {self._warmup.failed} failed")
+        if profiler.last_profile:
+            print(f"\nLast cProfile dump: {profiler.last_profile}")
+        
+        print(f"\n1. {'Disable' if profiler.enabled else 'Enable'} profiling")
+        print("2. Reset statistics and report cache")
+        print("3. Export statistics to JSON")
+        print("4. Profile next call of an operation (cProfile)")
+        print("5. Back")
+        
+        choice = input("\nSelect option (1-5): ").strip()
+        
+        if choice == '1':
+            profiler.enabled = not profiler.enabled
+            self.config['profiling'] = profiler.enabled
+            self._save_config()
+            print(f"{Colors.GREEN}✓ Profiling {'enabled' if profiler.enabled else 'disabled'}{Colors.RESET}")
+        
+        elif choice == '2':
+            profiler.reset()
+            self._report_cache.clear()
+            print(f"{Colors.GREEN}✓ Statistics reset{Colors.RESET}")
+        
+        elif choice == '3':
+            filename = profiler.export_json(f"performance_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+            print(f"{Colors.GREEN}✓ Exported to {filename}{Colors.RESET}")
+        
+        elif choice == '4':
+            print(f"Operations: {', '.join(Profiler.OPERATIONS)}")
+            operation = input("Operation to profile: ").strip()
+            if operation not in Profiler.OPERATIONS:
+                print(f"{Colors.RED}Unknown operation.{Colors.RESET}")
+                return
+            profiler.enabled = True
+            profiler.arm(operation)
+            print(f"{Colors.GREEN}✓ The next '{operation}' call will be saved as a .pstats file{Colors.RESET}")
     
     def run(self):
         """Main application loop"""
@@ -899,14 +3430,32 @@ class ExpenseTracker:
         
         print(f"\n{Colors.BOLD} Welcome to Penny Track{Colors.RESET}")
         print(f"Data file: {self.filename}")
+        if self._replica is not None:
+            print(f"Read-only replica, up to change {self._replica.seq} of {self._feed.path}")
         print(f"Total entries: {len(self.expenses)}")
         
+        if self.config.get('warmup', True):
+            self._warmup = WarmupWorker(self.snapshot, self._warmup_tasks(), self.profiler)
+            self._warmup.start()
+        
         while True:
+            self._report_exports()
             self.display_menu()
+            if self._warmup is not None:
+                self._warmup.idle()
             choice = input(f"\n{Colors.CYAN}Select an option (1-15): {Colors.RESET}").strip()
+            if self._warmup is not None:
+                self._warmup.busy()
+                if choice in ('3', '6', '7', '8', '9', '10', '12'):
+                    # Reuse a report being precomputed rather than race it;
+                    # any other action runs while the task stays paused
+                    self._warmup.settle()
             
             try:
-                if choice == '1':
+                self.sync()
+                if self._replica is not None and choice in ('1', '2', '4', '5', '10', '11'):
+                    print(f"\n{Colors.YELLOW}This is a read-only replica. Make changes on the primary ledger.{Colors.RESET}")
+                elif choice == '1':
                     self.add_expense(is_income=False)
                 elif choice == '2':
                     self.add_expense(is_income=True)
@@ -944,17 +3493,194 @@ class ExpenseTracker:
                 print(f"\n{Colors.RED}Error: {e}{Colors.RESET}")
                 print("Please try again.")
 
+            if self._warmup is not None:
+                self._warmup.idle()
             input(f"\n{Colors.CYAN}Press Enter to continue...{Colors.RESET}")
 
 
-def main():
-    tracker = ExpenseTracker()
+class LedgerRegistry:
+    """Serve many ledgers from one process.
+
+    Each ledger lives in its own directory under root and is opened lazily
+    on first use. Open trackers are kept in least-recently-used order; once
+    their estimated size exceeds memory_budget (or more than max_open are
+    resident) the coldest ones are flushed and closed. Sizes include each
+    ledger's indexes, columns and cached reports, and are re-measured when
+    the ledger is next requested. All ledgers share one ParallelAggregator,
+    so there is a single worker pool however many ledgers are open.
+    """
+    
+    def __init__(self, root="ledgers", memory_budget=256 * 1024 * 1024, max_open=None,
+                 parallel_workers=None, parallel_threshold=500_000):
+        self.root = root
+        self.memory_budget = memory_budget
+        self.max_open = max_open
+        self.aggregator = ParallelAggregator(parallel_workers, parallel_threshold)
+        
+        self._trackers = OrderedDict()
+        self._sizes = {}
+        self._opening = {}
+        self._lock = threading.RLock()
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def _ledger_dir(self, name):
+        if not name or name in ('.', '..') or os.sep in name or (os.altsep and os.altsep in name):
+            raise ValueError(f"Invalid ledger name: {name!r}")
+        return os.path.join(self.root, name)
+    
+    def names(self):
+        """Names of all ledgers on disk, opened or not"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(d for d in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, d)))
+    
+    def get(self, name):
+        """Return the tracker for name, opening it if it is not resident.
+
+        Opening reads the ledger and runs its recurring entries, so it
+        happens outside the registry lock; other callers asking for the
+        same ledger meanwhile wait for that open instead of repeating it.
+        """
+        while True:
+            with self._lock:
+                tracker = self._trackers.get(name)
+                if tracker is not None:
+                    self.hits += 1
+                    self._trackers.move_to_end(name)
+                    break
+                opening = self._opening.get(name)
+                if opening is None:
+                    ledger_dir = self._ledger_dir(name)
+                    self.misses += 1
+                    opening = self._opening[name] = threading.Event()
+                    break
+            # Another caller is opening it: use theirs (or retry if it failed)
+            opening.wait()
+        
+        if tracker is None:
+            try:
+                os.makedirs(ledger_dir, exist_ok=True)
+                tracker = ExpenseTracker(
+                    filename=os.path.join(ledger_dir, "expenses.csv"),
+                    budgets_file=os.path.join(ledger_dir, "budgets.json"),
+                    recurring_file=os.path.join(ledger_dir, "recurring.json"),
+                    config_file=os.path.join(ledger_dir, "config.json"),
+                    rates_file=os.path.join(ledger_dir, "rates.json"),
+                    aggregator=self.aggregator)
+            finally:
+                with self._lock:
+                    del self._opening[name]
+                    if tracker is not None:
+                        self._trackers[name] = tracker
+                opening.set()
+        
+        size = tracker.memory_footprint()
+        with self._lock:
+            if name in self._trackers:
+                self._sizes[name] = size
+            evicted = self._over_limits(keep=name)
+        self._close_all(evicted)
+        return tracker
+    
+    def _release(self, name):
+        with self._lock:
+            tracker = self._trackers.pop(name, None)
+            self._sizes.pop(name, None)
+        if tracker is not None:
+            self._close_all([tracker])
+        return tracker is not None
+    
+    def _close_all(self, trackers):
+        for tracker in trackers:
+            tracker.flush()
+            tracker.close()
+    
+    def evict(self, name):
+        """Flush and close one resident ledger"""
+        if self._release(name):
+            with self._lock:
+                self.evictions += 1
+    
+    def _over_limits(self, keep):
+        """Remove the coldest trackers (never keep) until the rest fit, and
+        return them; the caller closes them outside the lock"""
+        evicted = []
+        while len(self._trackers) > 1:
+            over_count = self.max_open is not None and len(self._trackers) > self.max_open
+            over_budget = sum(self._sizes.values()) > self.memory_budget
+            if not (over_count or over_budget):
+                break
+            coldest = next(iter(self._trackers))
+            if coldest == keep:
+                break
+            evicted.append(self._trackers.pop(coldest))
+            self._sizes.pop(coldest, None)
+            self.evictions += 1
+        return evicted
+    
+    def resident_bytes(self):
+        with self._lock:
+            return sum(self._sizes.values())
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'resident': list(self._trackers),
+                'resident_bytes': sum(self._sizes.values()),
+                'memory_budget': self.memory_budget,
+            }
+    
+    def close(self):
+        """Flush and close every resident ledger and the shared worker pool"""
+        for name in list(self._trackers):
+            self._release(name)
+        self.aggregator.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Penny Track - Expense & Income Tracker")
+    parser.add_argument('--profile', action='store_true', help="record per-operation timings")
+    parser.add_argument('--ledger', default="expenses.csv",
+                        help="ledger file; a .pledger file uses block-compressed storage")
+    parser.add_argument('--convert', nargs=2, metavar=('SOURCE', 'TARGET'),
+                        help="convert a ledger between .csv and .pledger and exit")
+    parser.add_argument('--feed', help="change feed written by the primary ledger "
+                                       "(default: the ledger's name with .changes.jsonl)")
+    parser.add_argument('--replica', nargs='?', const="replica", metavar='CHECKPOINT',
+                        help="open a read-only replica that follows --feed, checkpointing to CHECKPOINT.*")
+    args = parser.parse_args(argv)
+    
+    if args.convert:
+        source, target = args.convert
+        if target.endswith('.pledger') and not source.endswith('.pledger'):
+            # Entries from before multi-currency support are in the base currency
+            defaults = {'Type': 'expense', 'Currency': ExpenseTracker.read_config()['base_currency']}
+            store = BlockLedgerStore.from_csv(source, target, fields=ExpenseTracker.FIELDS, defaults=defaults)
+        elif source.endswith('.pledger') and not target.endswith('.pledger'):
+            store = BlockLedgerStore(source, ExpenseTracker.FIELDS)
+            store.export_csv(target)
+        else:
+            parser.error("--convert needs one .csv and one .pledger file")
+        stats = store.stats()
+        print(f"{Colors.GREEN}✓ Converted {stats['rows']} entries: {source} "
+              f"({os.path.getsize(source):,} bytes) -> {target} ({os.path.getsize(target):,} bytes){Colors.RESET}")
+        return
+    
+    tracker = ExpenseTracker(args.ledger, profile=args.profile, feed_file=args.feed, replica=args.replica)
     try:
         tracker.run()
     except KeyboardInterrupt:
         print(f"\n\n{Colors.BOLD}Goodbye!{Colors.RESET}")
     except Exception as e:
         print(f"\n{Colors.RED}An error occurred: {e}{Colors.RESET}")
+    finally:
+        tracker.close()
 
 
 if __name__ == "__main__":
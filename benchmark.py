@@ -0,0 +1,333 @@
+"""Benchmark harness for Penny Track.
+
+Generates synthetic ledgers and times the non-interactive parts of
+ExpenseTracker against them, reporting wall time, peak memory and
+rows/second as JSON.
+
+    python benchmark.py --sizes 10k,100k
+    python benchmark.py --sizes 10k --save-baseline bench_baseline.json
+    python benchmark.py --sizes 10k --baseline bench_baseline.json
+    python benchmark.py --sizes 1m --mixed-currency 0.3
+"""
+import argparse
+import contextlib
+import csv
+import io
+import itertools
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from PennyTrack import BlockLedgerStore, ExpenseTracker
+
+
+SIZES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000, '10m': 10_000_000}
+ADDS = 100
+
+# Category weights roughly follow a household ledger: a few categories take
+# most of the entries and a long tail shows up only occasionally.
+CATEGORIES = [
+    ('Groceries', 30), ('Dining', 18), ('Transport', 14), ('Utilities', 8),
+    ('Rent', 4), ('Entertainment', 7), ('Shopping', 6), ('Health', 4),
+    ('Travel', 2), ('Gifts', 2), ('Education', 2), ('Subscriptions', 3),
+]
+INCOME_CATEGORIES = [('Salary', 70), ('Freelance', 20), ('Interest', 10)]
+INCOME_RATIO = 0.08
+FOREIGN_CURRENCIES = [('EUR', 1.08), ('GBP', 1.27), ('JPY', 0.0067)]
+NOTE_WORDS = ("weekly shop coffee lunch with team bus pass electricity bill "
+              "birthday present refill online order pharmacy taxi cinema "
+              "books course fee monthly plan groceries market snacks").split()
+
+
+def generate_ledger(directory, rows, seed=42, end_date="2026-06-30", years=5, mixed=0.0):
+    """Write expenses.csv, budgets.json and recurring.json into directory.
+
+    With mixed > 0 that fraction of entries is recorded in foreign
+    currencies and a rates.json with monthly rates is written as well.
+    """
+    rng = random.Random(seed)
+    end = datetime.strptime(end_date, "%Y-%m-%d")
+    span_days = 365 * years
+
+    expense_names = [c for c, _ in CATEGORIES]
+    expense_weights = [w for _, w in CATEGORIES]
+    income_names = [c for c, _ in INCOME_CATEGORIES]
+    income_weights = [w for _, w in INCOME_CATEGORIES]
+
+    # Rows are written in date order, the way a ledger grows over time
+    start = end - timedelta(days=span_days)
+    dates = [(start + timedelta(days=d)).strftime("%Y-%m-%d") for d in range(span_days + 1)]
+
+    with open(os.path.join(directory, "expenses.csv"), 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['ID', 'Date', 'Amount', 'Category', 'Note', 'Type', 'Currency'])
+        for i in range(1, rows + 1):
+            date = dates[(i * span_days) // rows]
+            if rng.random() < INCOME_RATIO:
+                category = rng.choices(income_names, income_weights)[0]
+                amount = rng.lognormvariate(7.0, 0.6)
+                entry_type = 'income'
+            else:
+                category = rng.choices(expense_names, expense_weights)[0]
+                amount = rng.lognormvariate(3.0, 1.0)
+                entry_type = 'expense'
+            note = " ".join(rng.sample(NOTE_WORDS, rng.randint(0, 4)))
+            currency = 'USD'
+            if mixed and rng.random() < mixed:
+                currency, rate = rng.choice(FOREIGN_CURRENCIES)
+                amount /= rate
+            writer.writerow([i, date, f"{amount:.2f}", category, note, entry_type, currency])
+
+    if mixed:
+        rates = {}
+        for currency, rate in FOREIGN_CURRENCIES:
+            points = rates[currency] = {}
+            for months_back in range(12 * years + 1):
+                index = end.year * 12 + end.month - 1 - months_back
+                month = f"{index // 12:04d}-{index % 12 + 1:02d}-01"
+                points[month] = round(rate * rng.uniform(0.95, 1.05), 6)
+        with open(os.path.join(directory, "rates.json"), 'w') as f:
+            json.dump({'base': 'USD', 'rates': rates}, f, indent=2)
+
+    budgets = {}
+    for months_back in range(12):
+        index = end.year * 12 + end.month - 1 - months_back
+        month = f"{index // 12:04d}-{index % 12 + 1:02d}"
+        for category in expense_names[:6]:
+            budgets[f"{month}:{category}"] = round(rng.uniform(100, 1500), 2)
+    with open(os.path.join(directory, "budgets.json"), 'w') as f:
+        json.dump(budgets, f, indent=2)
+
+    # last_added is today so opening the ledger does not insert anything;
+    # the recurring benchmark backdates a copy explicitly.
+    today = datetime.now().strftime("%Y-%m-%d")
+    recurring = [
+        {'amount': '1200.00', 'category': 'Rent', 'note': 'rent', 'frequency': 'monthly', 'last_added': today},
+        {'amount': '15.99', 'category': 'Subscriptions', 'note': 'streaming', 'frequency': 'monthly', 'last_added': today},
+        {'amount': '35.00', 'category': 'Transport', 'note': 'bus pass', 'frequency': 'weekly', 'last_added': today},
+    ]
+    with open(os.path.join(directory, "recurring.json"), 'w') as f:
+        json.dump(recurring, f, indent=2)
+
+
+def measure(func, rows, track_memory=True, reset=None):
+    """Time func(), then re-run it under tracemalloc for peak memory.
+
+    rows is how many rows the operation handles, for rows_per_second.
+    reset(), if given, runs untimed after each call to undo its writes.
+    """
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    if reset:
+        reset()
+
+    result = {
+        'seconds': round(elapsed, 6),
+        'rows': rows,
+        'rows_per_second': round(rows / elapsed, 1) if elapsed > 0 else None,
+    }
+    if track_memory:
+        tracemalloc.start()
+        try:
+            func()
+            result['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        if reset:
+            reset()
+    return result
+
+
+def open_tracker():
+    with contextlib.redirect_stdout(io.StringIO()):
+        return ExpenseTracker()
+
+
+def run_suite(rows, workdir, seed, track_memory=True, mixed=0.0):
+    """Benchmark every operation against a freshly generated ledger"""
+    generate_ledger(workdir, rows, seed=seed, mixed=mixed)
+    previous_dir = os.getcwd()
+    os.chdir(workdir)
+    try:
+        tracker = open_tracker()
+        snapshot = tracker.snapshot()
+        last_month = max(e['Date'] for e in snapshot.rows)[:7]
+        prev_month = (datetime.strptime(last_month + "-01", "%Y-%m-%d") - timedelta(days=1)).strftime("%Y-%m")
+        last_year = f"{int(last_month[:4]) - 1}{last_month[4:]}"
+        with open("expenses.csv", 'rb') as f:
+            pristine = f.read()
+
+        def restore():
+            with open("expenses.csv", 'wb') as f:
+                f.write(pristine)
+            tracker._budget_monitor.reset()
+            tracker._load_expenses()
+
+        def add_entries():
+            # What add_expense does once its prompts are answered
+            for _ in range(ADDS):
+                tracker._add_entry(f"{last_month}-15", "12.34", "Groceries", "benchmark", 'expense')
+
+        def process_recurring():
+            for recurring in tracker.recurring_expenses:
+                recurring['last_added'] = "2000-01-01"
+            with contextlib.redirect_stdout(io.StringIO()):
+                tracker._process_recurring_expenses()
+
+        def compare_periods():
+            with contextlib.redirect_stdout(io.StringIO()):
+                tracker._compare_periods(last_month, prev_month, "current", "previous")
+                tracker._compare_periods(last_month, last_year, "current", "last year")
+
+        def cold(func):
+            # Report timings measure computation, not report cache hits or
+            # the columns and indexes memoized on the snapshot
+            def run():
+                tracker._report_cache.clear()
+                tracker.snapshot()._derived.clear()
+                return func()
+            return run
+
+        def search(by, *criteria):
+            # What the search menu does up to showing the first page
+            matches, _ = tracker._filter_entries(tracker.snapshot(), by, *criteria)
+            return list(itertools.islice(matches, tracker._page_size()))
+
+        def backup():
+            with contextlib.redirect_stdout(io.StringIO()):
+                tracker.backup_data()
+            for entry in os.listdir("."):
+                if entry.startswith("backup_"):
+                    shutil.rmtree(entry)
+
+        # (name, func, rows handled[, untimed reset]); most operations handle the whole ledger
+        operations = [
+            ('load', open_tracker),
+            ('next_id', tracker._get_next_id, 1),
+            ('add', add_entries, ADDS, restore),
+            ('rewrite', tracker._rewrite_expenses_file),
+            ('process_recurring', process_recurring, len(tracker.recurring_expenses), restore),
+            ('analytics_build', cold(lambda: tracker._analytics(tracker.snapshot()))),
+            ('monthly_summary', cold(lambda: tracker._month_summary(tracker.snapshot(), last_month))),
+            ('monthly_summary_cached', lambda: tracker._month_summary(tracker.snapshot(), last_month)),
+            ('statistics_dashboard', cold(lambda: tracker._dashboard_stats(tracker.snapshot()))),
+            ('compare_periods', cold(compare_periods)),
+            ('search_category', lambda: search('category', 'dining')),
+            ('search_date', lambda: search('date', f"{prev_month}-01", f"{last_month}-31")),
+            ('search_amount', lambda: search('amount', 50.0, 200.0)),
+            ('search_keyword', lambda: search('keyword', 'coffee')),
+            ('search_type', lambda: search('type', 'income')),
+            ('export_csv', lambda: tracker._export_csv(tracker.snapshot(), "0000-00-00", "9999-99-99", "bench_export.csv")),
+            ('export_json', lambda: tracker._export_json(tracker.snapshot(), "bench_export.json")),
+            ('export_text', lambda: tracker._export_text_report(tracker.snapshot(), last_month, "bench_report.txt")),
+            ('backup', backup),
+            ('block_import', lambda: BlockLedgerStore.from_csv("expenses.csv", "bench.pledger")),
+            ('block_read_month', lambda: list(BlockLedgerStore("bench.pledger", ExpenseTracker.FIELDS)
+                                              .read(f"{last_month}-01", f"{last_month}-31"))),
+        ]
+
+        results = {}
+        for name, func, *spec in operations:
+            count = spec[0] if spec else rows
+            reset = spec[1] if len(spec) > 1 else None
+            results[name] = measure(func, count, track_memory, reset)
+        results['block_import']['csv_bytes'] = os.path.getsize("expenses.csv")
+        results['block_import']['block_bytes'] = os.path.getsize("bench.pledger")
+        tracker.close()
+        return results
+    finally:
+        os.chdir(previous_dir)
+
+
+def compare_to_baseline(report, baseline, tolerance):
+    """List operations whose time grew by more than tolerance over the baseline"""
+    regressions = []
+    for size, operations in report['results'].items():
+        for name, result in operations.items():
+            before = baseline.get('results', {}).get(size, {}).get(name)
+            if not before or not before.get('seconds'):
+                continue
+            ratio = result['seconds'] / before['seconds']
+            if ratio > 1 + tolerance:
+                regressions.append({
+                    'size': size,
+                    'operation': name,
+                    'baseline_seconds': before['seconds'],
+                    'seconds': result['seconds'],
+                    'ratio': round(ratio, 3),
+                })
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Penny Track on synthetic ledgers")
+    parser.add_argument('--sizes', default='10k,100k',
+                        help="comma-separated ledger sizes: " + ", ".join(SIZES))
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc pass")
+    parser.add_argument('--mixed-currency', type=float, default=0.0, metavar='FRACTION',
+                        help="record this fraction of entries in foreign currencies")
+    parser.add_argument('--output', help="write the JSON report here instead of stdout")
+    parser.add_argument('--baseline', help="compare against a stored report")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="allowed slowdown over the baseline (0.25 = 25%%)")
+    parser.add_argument('--save-baseline', help="store this run as a baseline")
+    parser.add_argument('--keep', action='store_true', help="keep the generated ledgers")
+    args = parser.parse_args(argv)
+
+    sizes = [s.strip().lower() for s in args.sizes.split(',') if s.strip()]
+    unknown = [s for s in sizes if s not in SIZES]
+    if unknown:
+        parser.error(f"unknown size(s): {', '.join(unknown)}")
+
+    report = {
+        'python': sys.version.split()[0],
+        'seed': args.seed,
+        'mixed_currency': args.mixed_currency,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'results': {},
+    }
+    root = tempfile.mkdtemp(prefix="pennytrack_bench_")
+    try:
+        for size in sizes:
+            workdir = os.path.join(root, size)
+            os.makedirs(workdir)
+            report['results'][size] = run_suite(SIZES[size], workdir, args.seed, not args.no_memory,
+                                                args.mixed_currency)
+    finally:
+        if args.keep:
+            print(f"Ledgers kept in {root}", file=sys.stderr)
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        report['regressions'] = compare_to_baseline(report, baseline, args.tolerance)
+        if report['regressions']:
+            exit_code = 1
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            f.write(output + "\n")
+
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PennyTrack import AnalyticsEngine, LedgerSnapshot, ParallelAggregator, RateTable, np
+
+CATEGORIES = ['Groceries', 'Rent', 'Dining', 'Transport', 'Utilities', 'Fun']
+
+
+def ledger_snapshot(count, seed=7):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        rows.append({
+            'ID': str(i + 1),
+            'Date': f"{2024 + i % 3}-{1 + rng.randrange(12):02d}-{1 + rng.randrange(28):02d}",
+            # Repeated amounts make sure ties in the top expenses are broken the same way
+            'Amount': f"{rng.choice([4.5, 12.0, 12.0, 80.25, rng.randint(1, 90000) / 100]):.2f}",
+            'Category': rng.choice(CATEGORIES),
+            'Note': '',
+            'Type': rng.choice(['expense', 'expense', 'expense', 'income']),
+            'Currency': rng.choice(['USD', 'USD', 'EUR']),
+        })
+    return LedgerSnapshot(1, rows)
+
+
+def rates():
+    return RateTable('USD', {'EUR': {'2024-01-01': 1.08, '2026-06-01': 1.16}})
+
+
+@pytest.mark.parametrize('use_numpy', [True, False])
+def test_parallel_summary_matches_sequential(use_numpy):
+    if use_numpy and np is None:
+        pytest.skip("NumPy is not installed")
+    engine = AnalyticsEngine(ledger_snapshot(3000), use_numpy, rates())
+    aggregator = ParallelAggregator(max_workers=2, threshold=100)
+    try:
+        for lo, hi in [(0, len(engine)), (123, 2711)]:
+            assert aggregator.should_parallelize(hi - lo)
+            assert len(aggregator.shards(engine, lo, hi)) > 1
+            assert aggregator.summarize(engine, lo, hi) == engine.summarize(lo, hi)
+    finally:
+        aggregator.close()
+
+
+@pytest.mark.skipif(np is None, reason="NumPy is not installed")
+def test_numpy_and_plain_python_agree():
+    snapshot = ledger_snapshot(3000)
+    fast = AnalyticsEngine(snapshot, True, rates())
+    plain = AnalyticsEngine(snapshot, False, rates())
+    assert fast.categories == plain.categories
+    assert fast.cents.tolist() == plain.cents
+    assert fast.dashboard() == plain.dashboard()
+    assert fast.summarize(0, len(fast), top_k=20) == plain.summarize(0, len(plain), top_k=20)
@@ -0,0 +1,101 @@
+import csv
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PennyTrack import BlockLedgerStore, ExpenseTracker
+
+LEGACY_FIELDS = ExpenseTracker.FIELDS[:-1]
+
+
+def write_csv(path, fields, rows):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(fields)
+        writer.writerows(rows)
+
+
+def read_csv(path):
+    with open(path, newline='') as f:
+        return list(csv.reader(f))
+
+
+def ledger_rows(count, start=1, currency='USD'):
+    return [[str(i), f"2025-{1 + i % 12:02d}-{1 + i % 28:02d}", f"{i}.50", f"Cat{i % 5}",
+             f"note, {i}", 'income' if i % 7 == 0 else 'expense', currency]
+            for i in range(start, start + count)]
+
+
+def open_tracker(tmp_path, filename):
+    return ExpenseTracker(filename=str(filename),
+                          budgets_file=str(tmp_path / "budgets.json"),
+                          recurring_file=str(tmp_path / "recurring.json"),
+                          config_file=str(tmp_path / "config.json"),
+                          rates_file=str(tmp_path / "rates.json"),
+                          feed_file=False)
+
+
+def test_csv_round_trip(tmp_path):
+    rows = ledger_rows(25)
+    write_csv(tmp_path / "in.csv", ExpenseTracker.FIELDS, rows)
+    BlockLedgerStore.from_csv(tmp_path / "in.csv", str(tmp_path / "x.pledger"), block_rows=4)
+    store = BlockLedgerStore(str(tmp_path / "x.pledger"), ExpenseTracker.FIELDS)
+    store.append(ledger_rows(6, start=26))
+    store.export_csv(tmp_path / "out.csv")
+    assert read_csv(tmp_path / "out.csv") == [ExpenseTracker.FIELDS] + rows + ledger_rows(6, start=26)
+
+
+def test_legacy_csv_converts_to_current_fields(tmp_path):
+    rows = [row[:-1] for row in ledger_rows(10)]
+    write_csv(tmp_path / "old.csv", LEGACY_FIELDS, rows)
+    store = BlockLedgerStore.from_csv(tmp_path / "old.csv", str(tmp_path / "x.pledger"),
+                                      fields=ExpenseTracker.FIELDS, defaults={'Currency': 'USD'})
+    assert store.fields == ExpenseTracker.FIELDS
+
+    tracker = open_tracker(tmp_path, tmp_path / "x.pledger")
+    try:
+        assert [list(row.values()) for row in tracker.expenses] == [row + ['USD'] for row in rows]
+    finally:
+        tracker.close()
+
+
+def test_legacy_block_ledger_is_upgraded_once(tmp_path):
+    rows = [row[:-1] for row in ledger_rows(10)]
+    BlockLedgerStore(str(tmp_path / "old.pledger"), LEGACY_FIELDS).rewrite(rows)
+
+    tracker = open_tracker(tmp_path, tmp_path / "old.pledger")
+    try:
+        assert all(row['Currency'] == 'USD' for row in tracker.expenses)
+    finally:
+        tracker.close()
+    assert BlockLedgerStore(str(tmp_path / "old.pledger"), LEGACY_FIELDS).fields == ExpenseTracker.FIELDS
+
+
+def test_interrupted_append_keeps_previous_rows(tmp_path):
+    path = str(tmp_path / "x.pledger")
+    rows = ledger_rows(10)
+    BlockLedgerStore(path, ExpenseTracker.FIELDS, block_rows=4).rewrite(rows)
+    size = os.path.getsize(path)
+    BlockLedgerStore(path, ExpenseTracker.FIELDS).append(ledger_rows(3, start=11))
+
+    # Cut the append short, as a crash part-way through would
+    with open(path, 'r+b') as f:
+        f.truncate(size + (os.path.getsize(path) - size) // 2)
+    store = BlockLedgerStore(path, ExpenseTracker.FIELDS)
+    assert [list(row.values()) for row in store.read()] == rows
+
+    store.append(ledger_rows(2, start=11))
+    reopened = BlockLedgerStore(path, ExpenseTracker.FIELDS)
+    assert [list(row.values()) for row in reopened.read()] == rows + ledger_rows(2, start=11)
+
+
+def test_compaction_drops_dead_space(tmp_path):
+    path = str(tmp_path / "x.pledger")
+    store = BlockLedgerStore(path, ExpenseTracker.FIELDS, block_rows=8)
+    store.rewrite([])
+    store.COMPACT_MIN_BYTES = 0
+    for i in range(1, 41):
+        store.append(ledger_rows(1, start=i))
+    assert store.stats()['dead_bytes'] <= os.path.getsize(path) - store.stats()['dead_bytes']
+    assert [list(row.values()) for row in BlockLedgerStore(path, ExpenseTracker.FIELDS).read()] == ledger_rows(40)